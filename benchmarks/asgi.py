@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Benchmark the open connections a process holds in WSGI and ASGI modes.
+
+Every connection sends the headers and the beginning of the body of a
+``POST /editor/api/fixes`` request, then stalls like a slow upload. The
+benchmark reports the threads and memory of the server process, and the
+latency of a fresh request, while the connections are open.
+
+Requires Linux and ``uvicorn``. Run with ``python benchmarks/asgi.py``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+import multiprocessing
+import resource
+import socket
+import time
+
+from flask import Flask
+
+from invenio_record_editor import InvenioRecordEditor
+
+HOST = '127.0.0.1'
+
+
+def create_app():
+    """Create the Flask application, without limits on the connections."""
+    app = Flask('benchmark')
+    app.config.update(
+        RECORD_EDITOR_RATE_LIMITS={},
+        RECORD_EDITOR_CONCURRENCY_LIMITS={},
+    )
+    InvenioRecordEditor(app)
+    return app
+
+
+def serve_wsgi(port):
+    """Serve the Flask application with one thread per connection."""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    make_server(HOST, port, create_app(), threaded=True).serve_forever()
+
+
+def serve_asgi(port):
+    """Serve the ASGI application from an event loop."""
+    import uvicorn
+
+    from invenio_record_editor.asgi import create_asgi_app
+
+    uvicorn.run(create_asgi_app(create_app()), host=HOST, port=port,
+                log_level='error', backlog=4096)
+
+
+def process_status(pid):
+    """Return the threads and resident memory (MiB) of a process."""
+    status = {}
+    with open('/proc/{0}/status'.format(pid)) as fp:
+        for line in fp:
+            key, _, value = line.partition(':')
+            status[key] = value.split()
+    return int(status['Threads'][0]), int(status['VmRSS'][0]) / 1024
+
+
+def wait_for(port, timeout=10):
+    """Wait until the server accepts connections."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, port)).close()
+            return
+        except socket.error:
+            time.sleep(0.05)
+    raise RuntimeError('Server did not start.')
+
+
+def fresh_request_latency(port, timeout=5):
+    """Return the seconds taken to serve a new request, ``None`` if none."""
+    start = time.time()
+    sock = socket.create_connection((HOST, port), timeout=timeout)
+    try:
+        sock.sendall(b'GET /editor/api/metrics HTTP/1.1\r\n'
+                     b'Host: localhost\r\nConnection: close\r\n\r\n')
+        if not sock.recv(1024):
+            return None
+    except socket.timeout:
+        return None
+    finally:
+        sock.close()
+    return time.time() - start
+
+
+def run(name, target, port, connections):
+    """Benchmark a server with ``connections`` stalled uploads."""
+    server = multiprocessing.Process(target=target, args=(port,))
+    server.start()
+    sockets = []
+    try:
+        wait_for(port)
+        idle_threads, idle_rss = process_status(server.pid)
+        for _ in range(connections):
+            sock = socket.create_connection((HOST, port))
+            sock.sendall(b'POST /editor/api/fixes HTTP/1.1\r\n'
+                         b'Host: localhost\r\n'
+                         b'Content-Type: application/json\r\n'
+                         b'Content-Length: 1000\r\n\r\n{"titles": ')
+            sockets.append(sock)
+        time.sleep(1)
+        threads, rss = process_status(server.pid)
+        latency = fresh_request_latency(port)
+        print('{0:>5} {1:>11} {2:>9} {3:>9.1f} {4:>12}'.format(
+            name, connections, threads - idle_threads, rss - idle_rss,
+            '{0:.1f} ms'.format(latency * 1000) if latency is not None
+            else 'timeout'))
+    finally:
+        for sock in sockets:
+            sock.close()
+        server.terminate()
+        server.join()
+
+
+def main(connections=(100, 1000, 3000)):
+    """Run the benchmark."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    print('{0:>5} {1:>11} {2:>9} {3:>9} {4:>12}'.format(
+        'mode', 'connections', '+threads', '+RSS MiB', 'new request'))
+    port = 5500
+    for count in connections:
+        for name, target in (('wsgi', serve_wsgi), ('asgi', serve_asgi)):
+            port += 1
+            run(name, target, port, count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Benchmark duplicate detection on records with large author lists.
+
+Run with ``python benchmarks/duplicates.py``.
+
+The first table times records with a growing number of authors. The second
+one queries a collection of records sharing the tokens real records share,
+i.e. DOI prefixes, journal names, author initials and common title words,
+and reports the number of indexed entries each query compares, as well as
+how many near duplicates of indexed records are found.
+"""
+
+from __future__ import absolute_import, print_function
+
+import bisect
+import random
+import timeit
+
+from invenio_record_editor.config import RECORD_EDITOR_DUPLICATES_FIELDS
+from invenio_record_editor.duplicates import DuplicateIndex
+
+WORDS = ['word{0}'.format(i) for i in range(20000)]
+
+JOURNALS = ['PhysRevD', 'PhysRevLett', 'PhysRevC', 'PhysRevB']
+
+
+def make_record(rng, authors):
+    """Build a record with ``authors`` authors."""
+    return {
+        'titles': [{'title': ' '.join(rng.sample(WORDS, 12))}],
+        'dois': [{'value': '10.1000/{0}'.format(rng.randint(0, 10 ** 9))}],
+        'authors': [{'full_name': '{0}, {1}.'.format(*rng.sample(WORDS, 2))}
+                    for _ in range(authors)],
+    }
+
+
+def zipf_sampler(rng, words, exponent=1.0):
+    """Return a function drawing words with a Zipf distribution."""
+    cumulative = []
+    total = 0
+    for rank in range(len(words)):
+        total += 1.0 / (rank + 1) ** exponent
+        cumulative.append(total)
+
+    def sample():
+        value = rng.random() * cumulative[-1]
+        return words[bisect.bisect_left(cumulative, value)]
+    return sample
+
+
+def make_realistic_record(rng, number, title_word, surname):
+    """Build a record sharing prefixes and common words with the others."""
+    return {
+        'titles': [{'title': ' '.join(title_word() for _ in range(8))}],
+        'dois': [{'value': '10.1103/{0}.{1}'.format(
+            rng.choice(JOURNALS), number)}],
+        'authors': [
+            {'full_name': '{0}, {1}.'.format(
+                surname(), rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))}
+            for _ in range(rng.randint(1, 5))],
+    }
+
+
+def scanned(index, record):
+    """Return the number of entries a query of ``record`` compares."""
+    slots = set()
+    for key in index._band_keys(index.signature(record)):
+        slots.update(index._buckets.get(key, ()))
+    return len(slots)
+
+
+def percentile(values, fraction):
+    """Return a percentile of a list of values."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(records=10000, shared_records=100000, queries=200, repeat=20):
+    """Run the benchmark."""
+    rng = random.Random(0)
+    index = DuplicateIndex(RECORD_EDITOR_DUPLICATES_FIELDS)
+    for recid in range(records):
+        index.index(recid, make_record(rng, rng.choice((1, 3, 10, 50))))
+
+    print('{0:>8} {1:>12} {2:>12}'.format('authors', 'index ms', 'query ms'))
+    for authors in (3, 100, 1000, 3000):
+        record = make_record(rng, authors)
+        index_time = min(timeit.repeat(
+            lambda: index.index('bench', record), number=1, repeat=repeat))
+        query_time = min(timeit.repeat(
+            lambda: index.candidates(record), number=1, repeat=repeat))
+        print('{0:>8} {1:>12.2f} {2:>12.2f}'.format(
+            authors, index_time * 1000, query_time * 1000))
+
+    title_word = zipf_sampler(
+        rng, ['title{0}'.format(i) for i in range(5000)])
+    surname = zipf_sampler(rng, ['surname{0}'.format(i) for i in range(2000)])
+    index = DuplicateIndex(RECORD_EDITOR_DUPLICATES_FIELDS)
+    for number in range(shared_records):
+        index.index(number, make_realistic_record(
+            rng, number, title_word, surname))
+
+    times = []
+    slots = []
+    for number in range(shared_records, shared_records + queries):
+        record = make_realistic_record(rng, number, title_word, surname)
+        times.append(min(timeit.repeat(
+            lambda: index.candidates(record), number=1, repeat=3)))
+        slots.append(scanned(index, record))
+
+    # Near duplicates: an indexed record without its DOI and with a title
+    # word changed, e.g. the preprint of an article.
+    found = 0
+    rng = random.Random(0)
+    for number in rng.sample(range(shared_records), queries):
+        record = make_realistic_record(
+            random.Random(number), number, title_word, surname)
+        index.index(number, record)
+        words = record['titles'][0]['title'].split()
+        words[rng.randrange(len(words))] = title_word()
+        record['titles'] = [{'title': ' '.join(words)}]
+        del record['dois']
+        if number in [recid for recid, _ in index.candidates(record)]:
+            found += 1
+
+    print()
+    print('{0} records sharing prefixes, {1} queries of new records'.format(
+        shared_records, queries))
+    print('{0:>8} {1:>12} {2:>12}'.format('', 'query ms', 'scanned'))
+    for name, fraction in (('median', 0.5), ('p90', 0.9)):
+        print('{0:>8} {1:>12.2f} {2:>12}'.format(
+            name, percentile(times, fraction) * 1000,
+            percentile(slots, fraction)))
+    print('near duplicates found: {0}/{1}'.format(found, queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Benchmark the preview of a one-field change on a large record.
+
+Run with ``python benchmarks/preview.py``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import copy
+import timeit
+
+from flask import Flask
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.proxies import current_record_editor
+
+
+def make_record(fields=200, authors=2000):
+    """Build a large record."""
+    record = {
+        'titles': [{'title': 'Observation of a new boson'}],
+        'authors': [{'full_name': 'Author, {0}'.format(i),
+                     'affiliations': [{'value': 'CERN'}]}
+                    for i in range(authors)],
+    }
+    for i in range(fields):
+        record['field_{0}'.format(i)] = {'value': i, 'notes': ['a', 'b']}
+    return record
+
+
+def main(repeat=20):
+    """Run the benchmark."""
+    app = Flask('benchmark')
+    InvenioRecordEditor(app)
+    record = make_record()
+
+    with app.test_request_context():
+        renderer = current_record_editor.preview_renderer
+
+        def full_render():
+            renderer.clear()
+            renderer.render(record)
+
+        def change(field, value):
+            def run():
+                changed = copy.copy(record)
+                changed[field] = value
+                renderer.render(record)
+                renderer.render(changed)
+            # Two renders per run: the original record and the changed one.
+            return min(timeit.repeat(run, number=1, repeat=repeat)) / 2
+
+        authors = list(record['authors'])
+        authors[1000] = {'full_name': 'Author, changed',
+                         'affiliations': [{'value': 'CERN'}]}
+        patches = [
+            [{'op': 'replace', 'path': '/authors/1000/full_name',
+              'value': 'Author, {0}'.format(name)}]
+            for name in ('changed', 1000)
+        ]
+
+        def patch():
+            for operations in patches:
+                _, version[0] = renderer.render_patch(
+                    'bench', operations, version[0])
+
+        full = min(timeit.repeat(full_render, number=1, repeat=repeat))
+        version = [renderer.render(record, recid='bench')[1]]
+        cached = min(timeit.repeat(lambda: renderer.render(record),
+                                   number=1, repeat=repeat))
+        title = change('titles', [{'title': 'Observation of a boson'}])
+        author = change('authors', authors)
+        patched = min(timeit.repeat(patch, number=1, repeat=repeat)) / 2
+
+    print('record fields: {0}, authors: {1}'.format(
+        len(record), len(record['authors'])))
+    print('full render:              {0:8.2f} ms'.format(full * 1000))
+    print('unchanged record:         {0:8.2f} ms'.format(cached * 1000))
+    print('one title change:         {0:8.2f} ms'.format(title * 1000))
+    print('one author change:        {0:8.2f} ms'.format(author * 1000))
+    print('one author change, patch: {0:8.2f} ms'.format(patched * 1000))
+
+
+if __name__ == '__main__':
+    main()
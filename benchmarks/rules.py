@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Benchmark the normalization throughput as the number of rules grows.
+
+The compiled normalizer is compared with applying every rule in its own
+pass over the record. Run with ``python benchmarks/rules.py``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import timeit
+
+from invenio_record_editor.rules import Normalizer
+
+
+def make_record(fields):
+    """Build a record with ``fields`` fields holding padded strings."""
+    record = {
+        'authors': [{'full_name': ' Author, {0} '.format(i)}
+                    for i in range(50)],
+    }
+    for i in range(fields):
+        record['field_{0}'.format(i)] = [{'value': ' value {0} '.format(i)}]
+    return record
+
+
+def make_rules(count):
+    """Build ``count`` rules on distinct paths."""
+    rules = {'authors.full_name': ['strip_whitespace'],
+             'authors': ['deduplicate_authors']}
+    for i in range(count - len(rules)):
+        rules['field_{0}.value'.format(i)] = ['strip_whitespace']
+    return rules
+
+
+def throughput(f, record, repeat=5):
+    """Return the number of records per second processed by ``f``."""
+    number = 20
+    best = min(timeit.repeat(lambda: f(record), number=number,
+                             repeat=repeat))
+    return number / best
+
+
+def main():
+    """Run the benchmark."""
+    record = make_record(1000)
+    print('{0:>6} {1:>16} {2:>16}'.format(
+        'rules', 'compiled rec/s', 'per-rule rec/s'))
+    for count in (2, 10, 100, 1000):
+        rules = make_rules(count)
+        compiled = Normalizer(rules)
+        separate = [Normalizer({path: path_rules})
+                    for path, path_rules in rules.items()]
+
+        def per_rule(record):
+            for normalizer in separate:
+                record = normalizer.normalize(record)[0]
+            return record
+
+        print('{0:>6} {1:>16.0f} {2:>16.0f}'.format(
+            count,
+            throughput(lambda r: compiled.normalize(r), record),
+            throughput(per_rule, record)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Asyncio (ASGI) application serving the editor API endpoints.
+
+The application serves the ``/api/`` endpoints of the editor blueprint from
+an event loop, so that slow clients, such as large uploads, wait without
+holding a worker thread. It shares the configuration, the services (search
+index, preview renderer, rate limiter, ...) and the request handling of a
+Flask application initialized with
+:class:`~invenio_record_editor.ext.InvenioRecordEditor`, and can be served
+by any ASGI server next to the WSGI application, e.g.:
+
+.. code-block:: python
+
+    from invenio_record_editor.asgi import create_asgi_app
+
+    application = create_asgi_app(flask_app)
+
+.. code-block:: console
+
+    $ uvicorn myproject.asgi:application
+
+Requests are routed, checked against ``MAX_CONTENT_LENGTH`` and admitted by
+the rate limiter before their body is read. The handlers, which render
+templates, hash records and wait for locks, run in a dedicated pool of
+``RECORD_EDITOR_ASGI_WORKERS`` threads, and calls to storage backends which
+may block, such as the SQLite token buckets, in the default executor of the
+event loop, so that the loop only waits on the network. WebSocket
+connections are closed, as no endpoint accepts them.
+
+This module requires Python 3.5 or later.
+"""
+
+from __future__ import absolute_import, print_function
+
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+from flask import request as flask_request
+from werkzeug.exceptions import HTTPException
+
+from . import handlers
+from .limiter import MemoryStore
+from .views import blueprint
+
+
+class _HTTPError(Exception):
+    """Error turned into an HTTP response."""
+
+    def __init__(self, status, retry_after=None):
+        super(_HTTPError, self).__init__(status)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Disconnected(Exception):
+    """The client disconnected before sending the whole request."""
+
+
+class _Request(object):
+    """Request received by the ASGI application."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'')
+        self.args = dict(
+            (key, values[0]) for key, values in parse_qs(
+                self.query_string.decode('latin-1')).items())
+        self.headers = [(key.decode('latin-1'), value.decode('latin-1'))
+                        for key, value in scope.get('headers', [])]
+        self.remote_addr = (scope.get('client') or (None,))[0]
+        self.body = b''
+
+    def header(self, name):
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    @property
+    def content_length(self):
+        try:
+            return int(self.header('content-length'))
+        except (TypeError, ValueError):
+            return None
+
+    def get_json(self):
+        """Return the JSON body, ``None`` if there is none."""
+        mimetype = (self.header('content-type') or '').split(';')[0].strip()
+        if mimetype != 'application/json' and \
+                not (mimetype.startswith('application/') and
+                     mimetype.endswith('+json')):
+            return None
+        try:
+            return json.loads(self.body.decode('utf-8'))
+        except ValueError:
+            return None
+
+
+class EditorASGIApp(object):
+    """ASGI application serving the editor API endpoints."""
+
+    def __init__(self, app):
+        """Initialize the application.
+
+        :param app: the Flask application initialized with the editor
+            extension.
+        """
+        self.app = app
+        self.state = app.extensions['invenio-record-editor']
+        self.prefix = (blueprint.url_prefix or '').rstrip('/')
+        self.executor = ThreadPoolExecutor(
+            app.config['RECORD_EDITOR_ASGI_WORKERS'])
+        self.routes = {
+            '/api/search': (('GET',), 'search', self.search),
+            '/api/preview': (('POST', 'PATCH'), 'preview', self.preview),
+            '/api/fixes': (('POST',), 'suggest_fixes', self.suggest_fixes),
+            '/api/duplicates': (('POST',), 'duplicates', self.duplicates),
+            '/api/metrics': (('GET',), 'metrics', self.metrics),
+        }
+        self.limited = ('preview', 'suggest_fixes', 'duplicates')
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI connection."""
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'websocket':
+            await self._reject_websocket(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Unsupported connection type {0}.'.format(scope['type']))
+        try:
+            status, content_type, content, headers = await self._handle(
+                _Request(scope), receive)
+        except _Disconnected:
+            return
+        except (_HTTPError, HTTPException) as e:
+            status = getattr(e, 'status', None) or e.code
+            content_type = 'application/json'
+            content = json.dumps({'status': status})
+            headers = []
+            if getattr(e, 'retry_after', None) is not None:
+                headers.append((b'retry-after', str(
+                    int(math.ceil(e.retry_after))).encode('latin-1')))
+        content = content.encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode('latin-1')),
+                (b'content-length', str(len(content)).encode('latin-1')),
+            ] + headers,
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _reject_websocket(self, receive, send):
+        """Close a WebSocket connection, none of the endpoints accept one."""
+        message = await receive()
+        if message['type'] == 'websocket.connect':
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def _handle(self, request, receive):
+        path = request.path
+        if not path.startswith(self.prefix):
+            raise _HTTPError(404)
+        route = self.routes.get(path[len(self.prefix):].rstrip('/'))
+        if route is None:
+            raise _HTTPError(404)
+        methods, endpoint, handler = route
+        if request.method not in methods:
+            raise _HTTPError(405)
+        max_length = self.app.config.get('MAX_CONTENT_LENGTH')
+        length = request.content_length
+        if max_length is not None and length is not None and \
+                length > max_length:
+            raise _HTTPError(413)
+
+        controller = None
+        if endpoint in self.limited:
+            controller = await self._admit(request, endpoint)
+        try:
+            request.body = await self._read_body(receive, max_length)
+            return await self._run(handler, request)
+        finally:
+            if controller is not None:
+                controller.release()
+
+    async def _admit(self, request, endpoint):
+        """Apply the rate limits, return the admission slot taken, if any."""
+        priority = self._priority_class(request)
+        limiter = self.state.limiter
+        retry_after = await self._run_store(
+            limiter.check_rate, endpoint, priority, request.remote_addr)
+        if retry_after:
+            raise _HTTPError(429, retry_after)
+        controller = limiter.controllers.get((endpoint, priority))
+        if controller is None:
+            return None
+        if not controller.try_acquire():
+            # Only requests queued for a slot wait in a thread.
+            admitted = await asyncio.get_event_loop().run_in_executor(
+                None, controller.acquire)
+            if not admitted:
+                raise _HTTPError(429, limiter.retry_after)
+        return controller
+
+    async def _read_body(self, receive, max_length):
+        chunks = []
+        length = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise _Disconnected()
+            chunk = message.get('body', b'')
+            length += len(chunk)
+            if max_length is not None and length > max_length:
+                raise _HTTPError(413)
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def _run(self, func, *args):
+        """Run a handler in the pool of handler threads."""
+        return asyncio.get_event_loop().run_in_executor(
+            self.executor, partial(func, *args))
+
+    def _request_context(self, request):
+        return self.app.test_request_context(
+            self.prefix + '/', method=request.method,
+            query_string=request.query_string.decode('latin-1'),
+            headers=request.headers,
+            environ_base={'REMOTE_ADDR': request.remote_addr})
+
+    def _priority_class(self, request):
+        with self._request_context(request):
+            return self.state.priority_class_getter()
+
+    async def _run_store(self, func, *args):
+        """Call a storage backend, in the executor if it may block."""
+        if isinstance(self.state.limiter.store, MemoryStore):
+            return func(*args)
+        return await asyncio.get_event_loop().run_in_executor(
+            None, partial(func, *args))
+
+    def search(self, request):
+        """Search the records indexed by the editor."""
+        return _json(handlers.search(self.state, request.args))
+
+    def preview(self, request):
+        """Render a record as published, see :func:`.views.preview`."""
+        with self._request_context(request):
+            html, version = handlers.preview(
+                self.state, request.method, request.args, request.get_json(),
+                flask_request.if_match)
+        return 200, 'text/html; charset=utf-8', html, [
+            (b'etag', '"{0}"'.format(version).encode('latin-1'))]
+
+    def suggest_fixes(self, request):
+        """Return the normalization fixes for the record in the body."""
+        return _json(handlers.suggest_fixes(self.state, request.get_json()))
+
+    def duplicates(self, request):
+        """Return the likely duplicates of the record in the body."""
+        return _json(handlers.duplicates(
+            self.state, request.args, request.get_json()))
+
+    def metrics(self, request):
+        """Return the rate limiter queue depths and rejection counts."""
+        return _json(handlers.metrics(self.state))
+
+
+def _json(data):
+    return 200, 'application/json', json.dumps(data), []
+
+
+def create_asgi_app(app):
+    """Create the ASGI application of a Flask application."""
+    return EditorASGIApp(app)
@@ -25,3 +25,167 @@
 """Invenio module for editing JSON records."""
 
 RECORD_EDITOR_INDEX_TEMPLATE = 'invenio_record_editor/index.html'
+
+RECORD_EDITOR_SEARCH_FIELDS = [
+    'titles.title',
+    'authors.full_name',
+    'dois.value',
+    'arxiv_eprints.value',
+    'control_number',
+]
+"""Dotted paths of the record fields indexed for the sidebar search."""
+
+RECORD_EDITOR_SEARCH_PAGE_SIZE = 10
+"""Default number of hits returned per page by the sidebar search."""
+
+RECORD_EDITOR_SEARCH_MAX_PAGE_SIZE = 100
+"""Maximum number of hits which can be requested per page."""
+
+RECORD_EDITOR_SEARCH_RECORDS_LOADER = None
+"""Callable, or its import path, returning the ``(recid, record)`` pairs to
+search.
+
+The search index is kept in the memory of each process and only receives the
+records saved through it. If set, every process fills its index with the
+records returned by the loader the first time the index is used.
+"""
+
+RECORD_EDITOR_PREVIEW_TEMPLATE = 'invenio_record_editor/preview.html'
+"""Template assembling the rendered fields of the preview pane."""
+
+RECORD_EDITOR_PREVIEW_FIELD_TEMPLATE = \
+    'invenio_record_editor/preview/field.html'
+"""Default template rendering a single top-level field of a record."""
+
+RECORD_EDITOR_PREVIEW_LIST_TEMPLATE = \
+    'invenio_record_editor/preview/list.html'
+"""Template assembling the rendered items of a top-level list field."""
+
+RECORD_EDITOR_PREVIEW_ITEM_TEMPLATE = \
+    'invenio_record_editor/preview/item.html'
+"""Default template rendering a single item of a top-level list field."""
+
+RECORD_EDITOR_PREVIEW_FIELD_TEMPLATES = {}
+"""Per-field template overrides, e.g. ``{'authors': 'author.html'}``.
+
+The template of a list field renders one of its items.
+"""
+
+RECORD_EDITOR_PREVIEW_CACHE_SIZE = 50000
+"""Maximum number of rendered fragments kept in memory."""
+
+RECORD_EDITOR_PREVIEW_DOCUMENTS = 128
+"""Maximum number of previewed record versions kept to apply patches to."""
+
+RECORD_EDITOR_RATE_LIMITS = {
+    'preview': {
+        'interactive': {'rate': 10, 'burst': 20},
+        'bulk': {'rate': 2, 'burst': 5},
+    },
+    'suggest_fixes': {
+        'interactive': {'rate': 10, 'burst': 20},
+        'bulk': {'rate': 5, 'burst': 10},
+    },
+    'duplicates': {
+        'interactive': {'rate': 10, 'burst': 20},
+        'bulk': {'rate': 5, 'burst': 10},
+    },
+}
+"""Token bucket limits per endpoint and priority class.
+
+``rate`` is the number of requests per second allowed to a client and
+``burst`` the number of requests it can make at once.
+"""
+
+RECORD_EDITOR_CONCURRENCY_LIMITS = {
+    'preview': {
+        'interactive': 8,
+        'bulk': 2,
+    },
+    'suggest_fixes': {
+        'interactive': 8,
+        'bulk': 4,
+    },
+    'duplicates': {
+        'interactive': 8,
+        'bulk': 4,
+    },
+}
+"""Maximum number of concurrent requests per endpoint and priority class."""
+
+RECORD_EDITOR_ADMISSION_TIMEOUT = 0.5
+"""Seconds a request waits for a concurrency slot before being rejected."""
+
+RECORD_EDITOR_ADMISSION_RETRY_AFTER = 1
+"""``Retry-After`` seconds sent when admission control rejects a request."""
+
+RECORD_EDITOR_RATE_LIMIT_STORAGE = None
+"""Path of a SQLite file sharing the token buckets between the processes of
+a host. Buckets are kept in the memory of each process if not set."""
+
+RECORD_EDITOR_PRIORITY_HEADER = 'X-Record-Editor-Priority'
+"""Request header with which batch clients select the ``bulk`` class."""
+
+RECORD_EDITOR_PRIORITY_CLASS_GETTER = \
+    'invenio_record_editor.limiter:default_priority_class'
+"""Function, or its import path, returning the priority class of the current
+request.
+
+The default one only treats the sessions which loaded the editor UI as
+``interactive``, see :func:`.limiter.default_priority_class`. It should be
+replaced by one classifying the current user, e.g. by role.
+"""
+
+RECORD_EDITOR_NORMALIZATION_RULES = {
+    'titles.title': ['strip_whitespace'],
+    'abstracts.value': ['strip'],
+    'authors.full_name': ['strip_whitespace'],
+    'dois.value': ['normalize_doi'],
+    'arxiv_eprints.value': ['normalize_arxiv_id'],
+}
+"""Normalization rules applied to the records, keyed by dotted field path.
+
+See :mod:`invenio_record_editor.rules` for the available rules.
+"""
+
+RECORD_EDITOR_SUGGESTION_RULES = {
+    'authors': ['deduplicate_authors'],
+}
+"""Rules only suggested by the fixes endpoint, never applied on save.
+
+They are applied after the normalization rules of the same path.
+"""
+
+RECORD_EDITOR_NORMALIZE_ON_SAVE = True
+"""Whether to normalize the records saved through the editor."""
+
+RECORD_EDITOR_DUPLICATES_FIELDS = [
+    'titles.title',
+    'dois.value',
+    'authors.full_name',
+]
+"""Dotted paths of the record fields compared to detect duplicates."""
+
+RECORD_EDITOR_DUPLICATES_NUM_PERM = 64
+"""Number of values of the MinHash signature of a record."""
+
+RECORD_EDITOR_DUPLICATES_BANDS = 16
+"""Number of LSH bands, which must divide the number of signature values."""
+
+RECORD_EDITOR_DUPLICATES_THRESHOLD = 0.5
+"""Minimum estimated similarity of the reported duplicates."""
+
+RECORD_EDITOR_DUPLICATES_MAX_CANDIDATES = 10
+"""Maximum number of reported duplicates."""
+
+RECORD_EDITOR_DUPLICATES_MAX_VALUES = 100
+"""Maximum number of values of a field, e.g. authors, compared."""
+
+RECORD_EDITOR_DUPLICATES_INDEX_PATH = None
+"""Path of the memory-mapped file storing the record signatures.
+
+Signatures are kept in memory, and lost on restart, if not set.
+"""
+
+RECORD_EDITOR_ASGI_WORKERS = 4
+"""Number of threads running the request handlers of the ASGI application."""
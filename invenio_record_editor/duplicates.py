@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Duplicate detection with MinHash signatures and locality-sensitive hashing.
+
+Every record is reduced to a fixed-size MinHash signature computed over the
+terms of the configured fields. Only the first values of a field are taken,
+so that the thousands of authors of a large collaboration do not dominate
+the cost. Identifiers, such as DOIs, make a single term, and single
+characters, such as initials, are dropped, as their parts are shared by too
+many unrelated records. The signature is computed with one permutation
+hashing: every term is hashed once into one of the ``num_perm`` bins, which
+keep their minimum, and every empty bin borrows the value of a non-empty bin
+picked by hashing its own position (optimal densification). Signatures are
+split into bands, and records sharing a band are candidate duplicates,
+scored by the fraction of equal signature values.
+
+Signatures are stored in a memory-mapped file (or in memory when no path is
+configured) made of a header followed by fixed-size entries:
+
+- the JSON-encoded record identifier, NUL-padded to ``RECID_SIZE`` bytes;
+- the signature, as ``num_perm`` unsigned 32-bit integers.
+
+Entries are appended; saving a record again appends a new entry which
+supersedes the previous one. Once superseded entries outnumber the live
+ones, the file is compacted into a new file which replaces it. Several
+processes can share the file: appends and compactions are serialized with a
+file lock, and every process picks up the entries appended by the others
+and reopens the file once it has been replaced. The file is opened lazily
+by every process, so that workers forked after the application was loaded
+do not share the file descriptor, and thus the lock, of their parent.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from .search import get_values, tokenize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+_replace = getattr(os, 'replace', os.rename)
+
+MAGIC = b'IREDUP03'
+HEADER = struct.Struct('<8sII')
+RECID_SIZE = 64
+
+_MASK = (1 << 64) - 1
+_EMPTY = 1 << 32
+
+
+def _hash(value):
+    return struct.unpack(
+        '<Q', hashlib.sha1(value.encode('utf-8')).digest()[:8])[0]
+
+
+def _mix(value):
+    """Scramble a 64-bit integer (the SplitMix64 finalizer)."""
+    value = (value ^ (value >> 30)) * 0xbf58476d1ce4e5b9 & _MASK
+    value = (value ^ (value >> 27)) * 0x94d049bb133111eb & _MASK
+    return value ^ (value >> 31)
+
+
+def _terms(value):
+    """Return the terms of a field value.
+
+    A value without whitespace, e.g. a DOI, is taken as a whole, otherwise
+    its words of more than one character are returned.
+    """
+    if isinstance(value, (str, type(u''))) and value.strip() and \
+            len(value.split()) == 1:
+        return [value.strip().lower()]
+    return [term for term in tokenize(value) if len(term) > 1]
+
+
+class DuplicateIndex(object):
+    """MinHash/LSH index of the records saved through the editor."""
+
+    compact_threshold = 1024
+    """Minimum number of superseded entries before compacting."""
+
+    def __init__(self, fields=None, num_perm=64, bands=16, threshold=0.5,
+                 max_candidates=10, max_values=100, path=None):
+        """Initialize the index, loading the signatures stored in ``path``.
+
+        :param fields: dotted paths of the fields the signatures cover.
+        :param num_perm: the number of values of a signature.
+        :param bands: the number of LSH bands, which must divide
+            ``num_perm``.
+        :param threshold: the minimum estimated similarity of a candidate.
+        :param max_candidates: the maximum number of candidates returned.
+        :param max_values: the maximum number of values taken from a field.
+        :param path: the file storing the signatures, if any.
+        """
+        if num_perm % bands:
+            raise ValueError('bands must divide num_perm.')
+        self.fields = tuple(fields or ())
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.max_values = max_values
+        self.path = path
+        self._signature = struct.Struct('<{0}I'.format(num_perm))
+        self._entry_size = RECID_SIZE + self._signature.size
+        self._lock = threading.Lock()
+        self._reset()
+        self._file = None
+        self._map = None
+        self._pid = None
+        if path is None:
+            self._map = bytearray(HEADER.size + self._entry_size)
+            HEADER.pack_into(self._map, 0, MAGIC, self.num_perm, 0)
+        elif os.path.exists(path):
+            with open(path, 'rb') as fp:
+                self._check_header(fp.read(HEADER.size))
+
+    def __len__(self):
+        """Return the number of indexed records."""
+        with self._lock:
+            self._ensure_open()
+            self._refresh()
+            return len(self._slots)
+
+    def signature(self, record):
+        """Return the MinHash signature of a record, ``None`` if empty."""
+        hashes = set()
+        for field in self.fields:
+            values = islice(get_values(record, field), self.max_values)
+            terms = [term for value in values for term in _terms(value)]
+            for term in terms:
+                hashes.add(_hash(u'{0}:{1}'.format(field, term)))
+            for pair in zip(terms, terms[1:]):
+                hashes.add(_hash(u'{0}:{1} {2}'.format(field, *pair)))
+        if not hashes:
+            return None
+        num_perm = self.num_perm
+        bins = [_EMPTY] * num_perm
+        for h in hashes:
+            index = h % num_perm
+            value = h >> 32
+            if value < bins[index]:
+                bins[index] = value
+        signature = list(bins)
+        for index, value in enumerate(bins):
+            # Optimal densification: an empty bin borrows the value of a
+            # non-empty bin chosen by its own sequence of probes, so that
+            # the empty bins of a record do not all copy the same few bins.
+            attempt = 0
+            while value == _EMPTY:
+                attempt += 1
+                value = bins[_mix((index << 32) | attempt) % num_perm]
+            signature[index] = value
+        return tuple(signature)
+
+    def index(self, recid, record):
+        """Add or replace the signature of a record."""
+        signature = self.signature(record)
+        encoded = json.dumps(recid).encode('utf-8')
+        if len(encoded) > RECID_SIZE:
+            raise ValueError('Record identifier is too long.')
+        with self._lock:
+            self._ensure_open()
+            self._lock_file()
+            try:
+                self._refresh()
+                if signature is None:
+                    if recid not in self._slots:
+                        return
+                    # An all-zero signature marks a deleted record.
+                    signature = (0,) * self.num_perm
+                count = len(self._recids)
+                self._reserve(count + 1)
+                offset = HEADER.size + count * self._entry_size
+                self._map[offset:offset + RECID_SIZE] = \
+                    encoded.ljust(RECID_SIZE, b'\0')
+                self._signature.pack_into(
+                    self._map, offset + RECID_SIZE, *signature)
+                HEADER.pack_into(self._map, 0, MAGIC, self.num_perm,
+                                 count + 1)
+                self._load(count, count + 1)
+                live = len(self._slots)
+                if count + 1 - live >= max(live, self.compact_threshold):
+                    self._compact()
+            finally:
+                self._unlock_file()
+
+    def delete(self, recid):
+        """Remove a record from the candidates."""
+        self.index(recid, {})
+
+    def compact(self):
+        """Drop the superseded entries."""
+        with self._lock:
+            self._ensure_open()
+            self._lock_file()
+            try:
+                self._refresh()
+                self._compact()
+            finally:
+                self._unlock_file()
+
+    def candidates(self, record, exclude=None):
+        """Return the likely duplicates of a record.
+
+        :param exclude: identifier of the record itself, compared by its
+            text representation.
+        :returns: a list of ``(recid, similarity)`` tuples, most similar
+            first.
+        """
+        signature = self.signature(record)
+        if signature is None:
+            return []
+        if exclude is not None:
+            exclude = u'{0}'.format(exclude)
+        with self._lock:
+            self._ensure_open()
+            self._refresh()
+            slots = set()
+            for key in self._band_keys(signature):
+                slots.update(self._buckets.get(key, ()))
+            results = []
+            for slot in slots:
+                recid = self._recids[slot]
+                if u'{0}'.format(recid) == exclude:
+                    continue
+                other = self._signature.unpack_from(
+                    self._map,
+                    HEADER.size + slot * self._entry_size + RECID_SIZE)
+                similarity = sum(
+                    1 for x, y in zip(signature, other) if x == y
+                ) / self.num_perm
+                if similarity >= self.threshold:
+                    results.append((recid, similarity))
+        results.sort(key=lambda result: -result[1])
+        return results[:self.max_candidates]
+
+    def close(self):
+        """Close the underlying file."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._map.close()
+            self._map = None
+            self._file.close()
+            self._file = None
+        self._pid = None
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [(band, signature[band * rows:(band + 1) * rows])
+                for band in range(self.bands)]
+
+    def _reset(self):
+        self._buckets = defaultdict(set)
+        self._recids = []
+        self._slots = {}
+
+    def _ensure_open(self):
+        """Open the file in this process, or again if it was replaced."""
+        if self.path is None:
+            return
+        if self._pid != os.getpid() or self._replaced():
+            self._reopen()
+
+    def _reopen(self):
+        self._close()
+        self._reset()
+        self._open()
+        self._pid = os.getpid()
+
+    def _replaced(self):
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return True
+        opened = os.fstat(self._file.fileno())
+        return (current.st_dev, current.st_ino) != \
+            (opened.st_dev, opened.st_ino)
+
+    def _open(self):
+        open(self.path, 'ab').close()
+        self._file = open(self.path, 'r+b')
+        self._flock(True)
+        try:
+            if os.fstat(self._file.fileno()).st_size < HEADER.size:
+                self._file.truncate(HEADER.size + self._entry_size)
+                self._file.seek(0)
+                self._file.write(HEADER.pack(MAGIC, self.num_perm, 0))
+                self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._check_header(self._map[:HEADER.size])
+            self._refresh()
+        finally:
+            self._flock(False)
+
+    def _check_header(self, header):
+        if len(header) < HEADER.size:
+            return
+        magic, num_perm, _ = HEADER.unpack(header)
+        if magic != MAGIC or num_perm != self.num_perm:
+            raise ValueError(
+                'Incompatible duplicates index {0}.'.format(self.path))
+
+    def _refresh(self):
+        """Load the entries appended by other processes."""
+        count = HEADER.unpack_from(self._map, 0)[2]
+        if count > len(self._recids):
+            if self._file is not None:
+                size = os.fstat(self._file.fileno()).st_size
+                if size > len(self._map):
+                    self._map.close()
+                    self._map = mmap.mmap(self._file.fileno(), 0)
+                    count = HEADER.unpack_from(self._map, 0)[2]
+            self._load(len(self._recids), count)
+
+    def _load(self, start, stop):
+        for slot in range(start, stop):
+            offset = HEADER.size + slot * self._entry_size
+            recid = json.loads(
+                self._map[offset:offset + RECID_SIZE].rstrip(b'\0')
+                .decode('utf-8'))
+            signature = self._signature.unpack_from(
+                self._map, offset + RECID_SIZE)
+            self._recids.append(recid)
+            previous = self._slots.pop(recid, None)
+            if previous is not None:
+                self._unbucket(previous)
+            if any(signature):
+                self._slots[recid] = slot
+                for key in self._band_keys(signature):
+                    self._buckets[key].add(slot)
+
+    def _unbucket(self, slot):
+        """Remove a superseded entry from the buckets."""
+        signature = self._signature.unpack_from(
+            self._map, HEADER.size + slot * self._entry_size + RECID_SIZE)
+        for key in self._band_keys(signature):
+            bucket = self._buckets[key]
+            bucket.discard(slot)
+            if not bucket:
+                del self._buckets[key]
+        self._recids[slot] = None
+
+    def _compact(self):
+        """Rewrite the live entries, dropping the superseded ones."""
+        live = sorted(self._slots.values())
+        size = self._entry_size
+        data = bytearray(HEADER.size + max(len(live), 1) * size)
+        HEADER.pack_into(data, 0, MAGIC, self.num_perm, len(live))
+        for index, slot in enumerate(live):
+            start = HEADER.size + slot * size
+            offset = HEADER.size + index * size
+            data[offset:offset + size] = self._map[start:start + size]
+        if self._file is None:
+            self._reset()
+            self._map = data
+            self._load(0, len(live))
+            return
+        temp = self.path + '.compact'
+        with open(temp, 'wb') as fp:
+            fp.write(data)
+            fp.flush()
+            os.fsync(fp.fileno())
+        _replace(temp, self.path)
+        self._reopen()
+
+    def _reserve(self, count):
+        """Grow the map so that it holds at least ``count`` entries."""
+        size = HEADER.size + count * self._entry_size
+        if size <= len(self._map):
+            return
+        if self._file is None:
+            self._map.extend(
+                b'\0' * (max(size, 2 * len(self._map)) - len(self._map)))
+            return
+        current = os.fstat(self._file.fileno()).st_size
+        if current < size:
+            self._file.truncate(max(size, 2 * current))
+        new_map = mmap.mmap(self._file.fileno(), 0)
+        self._map.close()
+        self._map = new_map
+
+    def _flock(self, lock):
+        if self._file is not None and fcntl is not None:
+            fcntl.flock(self._file.fileno(),
+                        fcntl.LOCK_EX if lock else fcntl.LOCK_UN)
+
+    def _lock_file(self):
+        """Lock the file, reopening it if it was compacted meanwhile."""
+        self._flock(True)
+        while self._file is not None and self._replaced():
+            self._flock(False)
+            self._reopen()
+            self._flock(True)
+
+    def _unlock_file(self):
+        self._flock(False)
@@ -26,10 +26,82 @@
 
 from __future__ import absolute_import, print_function
 
+import threading
+
+from werkzeug.utils import import_string
+
 from . import config
+from .duplicates import DuplicateIndex
+from .limiter import MemoryStore, RateLimiter, SQLiteStore
+from .preview import PreviewRenderer
+from .receivers import fingerprint_record, index_record, normalize_record
+from .rules import Normalizer
+from .search import RecordIndex
+from .signals import before_record_save, record_saved
 from .views import blueprint
 
 
+class _RecordEditorState(object):
+    """Record editor state."""
+
+    def __init__(self, app):
+        """Initialize state."""
+        self.app = app
+        self._search_index = RecordIndex(
+            app.config['RECORD_EDITOR_SEARCH_FIELDS'])
+        self._search_loader = app.config['RECORD_EDITOR_SEARCH_RECORDS_LOADER']
+        self._search_lock = threading.Lock()
+        self.preview_renderer = PreviewRenderer(
+            app.config['RECORD_EDITOR_PREVIEW_TEMPLATE'],
+            app.config['RECORD_EDITOR_PREVIEW_FIELD_TEMPLATE'],
+            app.config['RECORD_EDITOR_PREVIEW_LIST_TEMPLATE'],
+            app.config['RECORD_EDITOR_PREVIEW_ITEM_TEMPLATE'],
+            field_templates=app.config[
+                'RECORD_EDITOR_PREVIEW_FIELD_TEMPLATES'],
+            cache_size=app.config['RECORD_EDITOR_PREVIEW_CACHE_SIZE'],
+            documents=app.config['RECORD_EDITOR_PREVIEW_DOCUMENTS'])
+        rules = app.config['RECORD_EDITOR_NORMALIZATION_RULES']
+        self.normalizer = Normalizer(rules)
+        suggestion_rules = dict(rules)
+        for path, path_rules in app.config[
+                'RECORD_EDITOR_SUGGESTION_RULES'].items():
+            suggestion_rules[path] = \
+                list(suggestion_rules.get(path, ())) + list(path_rules)
+        self.suggestion_normalizer = Normalizer(suggestion_rules)
+        self.duplicates = DuplicateIndex(
+            app.config['RECORD_EDITOR_DUPLICATES_FIELDS'],
+            num_perm=app.config['RECORD_EDITOR_DUPLICATES_NUM_PERM'],
+            bands=app.config['RECORD_EDITOR_DUPLICATES_BANDS'],
+            threshold=app.config['RECORD_EDITOR_DUPLICATES_THRESHOLD'],
+            max_candidates=app.config[
+                'RECORD_EDITOR_DUPLICATES_MAX_CANDIDATES'],
+            max_values=app.config['RECORD_EDITOR_DUPLICATES_MAX_VALUES'],
+            path=app.config['RECORD_EDITOR_DUPLICATES_INDEX_PATH'])
+        storage = app.config['RECORD_EDITOR_RATE_LIMIT_STORAGE']
+        self.limiter = RateLimiter(
+            rate_limits=app.config['RECORD_EDITOR_RATE_LIMITS'],
+            concurrency_limits=app.config['RECORD_EDITOR_CONCURRENCY_LIMITS'],
+            store=SQLiteStore(storage) if storage else MemoryStore(),
+            timeout=app.config['RECORD_EDITOR_ADMISSION_TIMEOUT'],
+            retry_after=app.config['RECORD_EDITOR_ADMISSION_RETRY_AFTER'])
+        getter = app.config['RECORD_EDITOR_PRIORITY_CLASS_GETTER']
+        self.priority_class_getter = getter if callable(getter) \
+            else import_string(getter)
+
+    @property
+    def search_index(self):
+        """Return the search index, filled by the records loader if any."""
+        if self._search_loader is not None:
+            with self._search_lock:
+                loader = self._search_loader
+                if loader is not None:
+                    if not callable(loader):
+                        loader = import_string(loader)
+                    self._search_index.bulk_index(loader())
+                    self._search_loader = None
+        return self._search_index
+
+
 class InvenioRecordEditor(object):
     """Invenio-RecordEditor extension."""
 
@@ -42,7 +114,10 @@ class InvenioRecordEditor(object):
         """Flask application initialization."""
         self.init_config(app)
         app.register_blueprint(blueprint)
-        app.extensions['invenio-record-editor'] = self
+        before_record_save.connect(normalize_record)
+        record_saved.connect(index_record)
+        record_saved.connect(fingerprint_record)
+        app.extensions['invenio-record-editor'] = _RecordEditorState(app)
 
     def init_config(self, app):
         """Initialize configuration."""
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Request handling shared by the editor API views and the ASGI application.
+
+Handlers take the editor state and the parsed request, return the response
+data and raise :class:`werkzeug.exceptions.HTTPException` on errors.
+"""
+
+from __future__ import absolute_import, print_function
+
+from jsonpatch import JsonPatchException
+from jsonpointer import JsonPointerException
+from werkzeug.exceptions import abort
+
+
+def _int_arg(args, key, default):
+    try:
+        return int(args[key])
+    except (KeyError, ValueError):
+        return default
+
+
+def _record(data):
+    if not isinstance(data, dict):
+        abort(400)
+    return data
+
+
+def search(state, args):
+    """Search the records indexed by the editor."""
+    config = state.app.config
+    page = _int_arg(args, 'page', 1)
+    size = _int_arg(args, 'size', config['RECORD_EDITOR_SEARCH_PAGE_SIZE'])
+    if page < 1 or size < 1 or \
+            size > config['RECORD_EDITOR_SEARCH_MAX_PAGE_SIZE']:
+        abort(400)
+    total, hits = state.search_index.search(
+        args.get('q', ''), page=page, size=size)
+    return dict(total=total, hits=hits, page=page, size=size)
+
+
+def preview(state, method, args, data, if_match):
+    """Render a record as published, see :func:`.views.preview`.
+
+    Must be called in a request context, to render the templates.
+
+    :param if_match: the :class:`werkzeug.datastructures.ETags` of the
+        ``If-Match`` header, naming the version a patch applies to.
+    :returns: a tuple ``(html, version)``.
+    """
+    renderer = state.preview_renderer
+    recid = args.get('recid')
+    if method == 'POST':
+        return renderer.render(_record(data), recid=recid)
+    if recid is None or not isinstance(data, list):
+        abort(400)
+    versions = list(if_match)
+    if not versions:
+        abort(428)
+    for version in versions:
+        try:
+            return renderer.render_patch(recid, data, version)
+        except KeyError:
+            continue
+        except (JsonPatchException, JsonPointerException):
+            abort(400)
+    abort(409)
+
+
+def suggest_fixes(state, data):
+    """Return the normalization fixes for a record."""
+    normalized, fixes = state.suggestion_normalizer.normalize(_record(data))
+    return dict(fixes=fixes, record=normalized)
+
+
+def duplicates(state, args, data):
+    """Return the likely duplicates of a record."""
+    candidates = state.duplicates.candidates(
+        _record(data), exclude=args.get('recid'))
+    return dict(hits=[
+        {'recid': recid, 'similarity': similarity}
+        for recid, similarity in candidates
+    ])
+
+
+def metrics(state):
+    """Return the rate limiter queue depths and rejection counts."""
+    return dict(limiter=state.limiter.metrics())
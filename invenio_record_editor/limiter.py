@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Rate limiting and admission control for the editor endpoints."""
+
+from __future__ import absolute_import, division, print_function
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from flask import abort, current_app, jsonify, request, session
+
+from .proxies import current_record_editor
+
+INTERACTIVE = 'interactive'
+"""Priority class of requests made by curators through the editor UI."""
+
+BULK = 'bulk'
+"""Priority class of batch and scripted requests."""
+
+EDITOR_SESSION_KEY = 'record_editor'
+"""Session key marking the sessions which loaded the editor UI."""
+
+
+def default_priority_class():
+    """Return the priority class of the current request.
+
+    Requests are interactive when their session loaded the editor UI, as
+    the session is signed by the server, and bulk otherwise. Clients can
+    also opt in to the bulk class with the header configured in
+    ``RECORD_EDITOR_PRIORITY_HEADER``. Sessions require a ``SECRET_KEY``,
+    without which every request is bulk.
+
+    Deployments should classify requests on what they know of the user
+    instead, e.g. their roles, with ``RECORD_EDITOR_PRIORITY_CLASS_GETTER``.
+    """
+    header = current_app.config['RECORD_EDITOR_PRIORITY_HEADER']
+    if request.headers.get(header, '').lower() == BULK:
+        return BULK
+    if session.get(EDITOR_SESSION_KEY):
+        return INTERACTIVE
+    return BULK
+
+
+class MemoryStore(object):
+    """Token buckets kept in the memory of the current process."""
+
+    max_keys = 10000
+    """Number of buckets above which full buckets are discarded."""
+
+    def __init__(self):
+        """Initialize the store."""
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst, now=None):
+        """Take a token from a bucket.
+
+        :param key: the bucket key.
+        :param rate: the number of tokens added per second.
+        :param burst: the capacity of the bucket.
+        :returns: ``0`` if a token was taken, otherwise the number of
+            seconds after which one will be available.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, last, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            retry_after = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not retry_after:
+                tokens -= 1
+            self._buckets[key] = (tokens, now,
+                                  now + (burst - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        for key, (_, _, full_at) in list(self._buckets.items()):
+            if full_at <= now:
+                del self._buckets[key]
+
+
+class SQLiteStore(object):
+    """Token buckets shared by the processes of a host in a SQLite file.
+
+    Connections are opened on first use by each thread of each process, so
+    that workers forked after the application is created do not share the
+    connection of their parent.
+    """
+
+    prune_interval = 60.0
+    """Seconds between two removals of the full buckets from the file."""
+
+    def __init__(self, path, timeout=5.0):
+        """Initialize the store.
+
+        :param path: path of the database file.
+        :param timeout: seconds to wait for the database lock.
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pruned_at = time.time()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL, last REAL, '
+                'full_at REAL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS buckets_full_at '
+                'ON buckets (full_at)')
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def consume(self, key, rate, burst, now=None):
+        """Take a token from a bucket, see :meth:`MemoryStore.consume`."""
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, last FROM buckets WHERE key = ?',
+                (key,)).fetchone()
+            tokens, last = row or (burst, now)
+            tokens = min(burst, tokens + (now - last) * rate)
+            retry_after = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not retry_after:
+                tokens -= 1
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, last, full_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + (burst - tokens) / rate))
+            if now - self._pruned_at >= self.prune_interval:
+                self._pruned_at = now
+                # A full bucket is the same as a missing one.
+                connection.execute(
+                    'DELETE FROM buckets WHERE full_at <= ?', (now,))
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return retry_after
+
+
+class AdmissionController(object):
+    """Bound the number of requests of a class processed concurrently.
+
+    Requests above the limit wait in a queue for at most ``timeout``
+    seconds before being rejected.
+    """
+
+    def __init__(self, limit, timeout=0.0):
+        """Initialize the controller."""
+        self.limit = limit
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot, return ``False`` if none became free."""
+        with self._condition:
+            if self.in_flight >= self.limit:
+                deadline = time.time() + self.timeout
+                self.queued += 1
+                try:
+                    while self.in_flight >= self.limit:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            return True
+
+    def try_acquire(self):
+        """Take a free slot without waiting, return ``False`` if none."""
+        with self._condition:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        """Free a slot."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+
+class RateLimiter(object):
+    """Per endpoint and priority class rate limiting and admission control.
+
+    ``rate_limits`` and ``concurrency_limits`` map an endpoint name to a
+    dictionary keyed by priority class, e.g.:
+
+    .. code-block:: python
+
+        rate_limits = {'preview': {'interactive': {'rate': 10, 'burst': 20}}}
+        concurrency_limits = {'preview': {'interactive': 8}}
+
+    Endpoints and classes without a configured limit are not limited.
+    """
+
+    def __init__(self, rate_limits=None, concurrency_limits=None,
+                 store=None, timeout=0.0, retry_after=1):
+        """Initialize the limiter.
+
+        :param store: the token bucket store, defaults to a
+            :class:`MemoryStore`.
+        :param timeout: seconds a request waits for a concurrency slot.
+        :param retry_after: seconds advertised to requests rejected by
+            admission control.
+        """
+        self.rate_limits = rate_limits or {}
+        self.store = store or MemoryStore()
+        self.retry_after = retry_after
+        self.controllers = dict(
+            ((endpoint, priority), AdmissionController(limit, timeout))
+            for endpoint, limits in (concurrency_limits or {}).items()
+            for priority, limit in limits.items()
+        )
+        self._rate_rejected = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def check_rate(self, endpoint, priority, client):
+        """Take a token for a client, return the seconds to wait if none."""
+        limit = self.rate_limits.get(endpoint, {}).get(priority)
+        if not limit:
+            return 0
+        retry_after = self.store.consume(
+            '{0}:{1}:{2}'.format(endpoint, priority, client),
+            limit['rate'], limit['burst'])
+        if retry_after:
+            with self._lock:
+                self._rate_rejected[(endpoint, priority)] += 1
+        return retry_after
+
+    def metrics(self):
+        """Return queue depths and rejection counts per endpoint and class."""
+        with self._lock:
+            rate_rejected = dict(self._rate_rejected)
+        keys = set(self.controllers) | set(rate_rejected)
+        for endpoint, limits in self.rate_limits.items():
+            keys.update((endpoint, priority) for priority in limits)
+        metrics = {}
+        for endpoint, priority in keys:
+            controller = self.controllers.get((endpoint, priority))
+            metrics.setdefault(endpoint, {})[priority] = {
+                'in_flight': controller.in_flight if controller else 0,
+                'queued': controller.queued if controller else 0,
+                'rejected_concurrency':
+                    controller.rejected if controller else 0,
+                'rejected_rate': rate_rejected.get((endpoint, priority), 0),
+            }
+        return metrics
+
+
+def _too_many_requests(retry_after):
+    response = jsonify(status=429, message='Too many requests.')
+    response.status_code = 429
+    response.headers['Retry-After'] = str(int(math.ceil(retry_after)))
+    return response
+
+
+def rate_limited(f):
+    """Apply the editor rate limits and admission control to a view."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        state = current_record_editor
+        limiter = state.limiter
+        endpoint = request.endpoint.rsplit('.', 1)[-1]
+        priority = state.priority_class_getter()
+
+        retry_after = limiter.check_rate(
+            endpoint, priority, request.remote_addr)
+        if retry_after:
+            abort(_too_many_requests(retry_after))
+
+        controller = limiter.controllers.get((endpoint, priority))
+        if controller is None:
+            return f(*args, **kwargs)
+        if not controller.acquire():
+            abort(_too_many_requests(limiter.retry_after))
+        try:
+            return f(*args, **kwargs)
+        finally:
+            controller.release()
+    return decorated
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Record preview rendered from cached fragments.
+
+Every top-level field of a record is rendered on its own, and list fields
+are rendered item by item, in chunks of items, so that editing one author
+of a large collaboration only renders that author and its chunk again.
+Fragments are cached, keyed by their template, their field and a hash of
+the subtree they render.
+
+A preview can also be updated with a JSON Patch against a record previewed
+earlier, in which case only the fields, or the list items, touched by the
+patch are hashed again. Every preview comes with the version of its record,
+which a patch must name, so that it is never applied to another version of
+the record, e.g. one previewed in another tab.
+"""
+
+from __future__ import absolute_import, print_function
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from flask import render_template
+from jsonpatch import InvalidJsonPatch, JsonPatch
+from jsonpointer import JsonPointer
+
+
+def subtree_hash(value):
+    """Return a stable hash of a JSON subtree."""
+    dump = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(dump.encode('utf-8')).hexdigest()
+
+
+def _shallow_copy(value):
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _copy_path(document, parts):
+    """Copy the containers along ``parts``, sharing everything else."""
+    root = node = _shallow_copy(document)
+    for part in parts[:-1]:
+        try:
+            if isinstance(node, list):
+                part = int(part)
+            child = _shallow_copy(node[part])
+        except (KeyError, IndexError, TypeError, ValueError):
+            break
+        node[part] = child
+        node = child
+    return root
+
+
+class PreviewRenderer(object):
+    """Render a record fragment by fragment, caching every fragment."""
+
+    chunk_template = 'invenio_record_editor/preview/chunk.html'
+    """Template assembling a chunk of rendered list items."""
+
+    chunk_size = 100
+    """Number of list items per chunk."""
+
+    def __init__(self, template, field_template, list_template,
+                 item_template, field_templates=None, cache_size=50000,
+                 documents=128):
+        """Initialize the renderer.
+
+        :param template: template assembling the fields.
+        :param field_template: default template rendering a single field.
+        :param list_template: template assembling the items of a list field.
+        :param item_template: default template rendering a single item of a
+            list field.
+        :param field_templates: per-field template overrides, rendering the
+            field, or its items for a list field.
+        :param cache_size: maximum number of cached fragments.
+        :param documents: maximum number of record versions kept to apply
+            patches.
+        """
+        self.template = template
+        self.field_template = field_template
+        self.list_template = list_template
+        self.item_template = item_template
+        self.field_templates = field_templates or {}
+        self.cache_size = cache_size
+        self.documents = documents
+        self._cache = OrderedDict()
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, record, recid=None):
+        """Render the preview of a record.
+
+        :param recid: if given, the record is kept so that the following
+            previews of the same identifier can be sent as patches.
+        :returns: a tuple ``(html, version)``, where ``version`` identifies
+            the content of the record.
+        """
+        keys = dict((field, self._field_keys(field, value))
+                    for field, value in record.items())
+        return self._render(recid, record, keys)
+
+    def render_patch(self, recid, patch, version):
+        """Render the preview of a kept record patched.
+
+        :param patch: a list of JSON Patch operations.
+        :param version: the version of the record the patch applies to.
+        :returns: a tuple ``(html, version)``, see :meth:`render`.
+        :raises KeyError: if no record of ``recid`` is kept in ``version``.
+        :raises jsonpatch.JsonPatchException: if the patch is invalid.
+        :raises jsonpointer.JsonPointerException: if the patch is invalid.
+        """
+        with self._lock:
+            record, keys = self._documents[(recid, version)]
+        patch = JsonPatch(patch)
+        # Field to the indexes of its changed items, None if all changed.
+        changed = {}
+        for operation in patch.patch:
+            if not isinstance(operation, dict):
+                raise InvalidJsonPatch('Operation must be an object.')
+            if operation.get('op') == 'test':
+                continue
+            parts = JsonPointer(operation.get('path', '')).parts
+            if not parts or operation.get('op') == 'move':
+                # Moved subtrees would be shared with the kept record.
+                record = patch.apply(record)
+                if not isinstance(record, dict):
+                    raise InvalidJsonPatch('Record must be an object.')
+                return self.render(record, recid=recid)
+            record = _copy_path(record, parts)
+            field = parts[0]
+            items = changed.get(field, set())
+            field_keys = keys.get(field)
+            if items is not None and isinstance(field_keys, list) and \
+                    len(parts) > 1 and parts[1].isdigit() and \
+                    int(parts[1]) < len(field_keys) and \
+                    (len(parts) > 2 or operation.get('op') == 'replace'):
+                items.add(int(parts[1]))
+                changed[field] = items
+            else:
+                changed[field] = None
+        record = patch.apply(record, in_place=True)
+        keys = dict(keys)
+        for field, items in changed.items():
+            if field not in record:
+                keys.pop(field, None)
+            elif items is None:
+                keys[field] = self._field_keys(field, record[field])
+            else:
+                keys[field] = list(keys[field])
+                template = keys[field][0][0]
+                for index in items:
+                    keys[field][index] = (
+                        template, field, subtree_hash(record[field][index]))
+        return self._render(recid, record, keys)
+
+    def clear(self):
+        """Empty the fragment cache and the kept records."""
+        with self._lock:
+            self._cache.clear()
+            self._documents.clear()
+
+    def _store(self, key, record, keys):
+        with self._lock:
+            self._documents.pop(key, None)
+            self._documents[key] = (record, keys)
+            while len(self._documents) > self.documents:
+                self._documents.popitem(last=False)
+
+    @staticmethod
+    def _version(keys):
+        """Return the version of a record from the hashes of its fields."""
+        digest = hashlib.sha1()
+        for field in sorted(keys):
+            field_keys = keys[field]
+            digest.update(json.dumps(field).encode('utf-8'))
+            if isinstance(field_keys, list):
+                digest.update(b'[')
+                for key in field_keys:
+                    digest.update(key[2].encode('ascii'))
+                digest.update(b']')
+            else:
+                digest.update(field_keys[2].encode('ascii'))
+        return digest.hexdigest()
+
+    def _field_keys(self, field, value):
+        """Return the cache keys of a field, one per item for a list."""
+        if isinstance(value, list):
+            template = self.field_templates.get(field, self.item_template)
+            return [(template, field, subtree_hash(item)) for item in value]
+        template = self.field_templates.get(field, self.field_template)
+        return (template, field, subtree_hash(value))
+
+    def _render(self, recid, record, keys):
+        version = self._version(keys)
+        if recid is not None:
+            self._store((recid, version), record, keys)
+        fragments = []
+        for field in sorted(record):
+            value = record[field]
+            field_keys = keys[field]
+            if isinstance(field_keys, list):
+                fragment = render_template(
+                    self.list_template, field=field,
+                    fragments=self._render_chunks(field, value, field_keys))
+            else:
+                fragment = self._fragment(field_keys, partial(
+                    render_template, field_keys[0], field=field,
+                    value=value))
+            fragments.append((field, fragment))
+        return render_template(self.template, record=record,
+                               fragments=fragments), version
+
+    def _render_chunks(self, field, items, keys):
+        """Render the items of a list field, in cached chunks."""
+        chunks = []
+        for start in range(0, len(keys), self.chunk_size):
+            stop = start + self.chunk_size
+            chunks.append(self._fragment(
+                (self.chunk_template, field, tuple(keys[start:stop])),
+                partial(self._render_chunk, field, items[start:stop],
+                        keys[start:stop])))
+        return chunks
+
+    def _render_chunk(self, field, items, keys):
+        return render_template(self.chunk_template, field=field, fragments=[
+            self._fragment(key, partial(
+                render_template, key[0], field=field, item=item))
+            for key, item in zip(keys, items)
+        ])
+
+    def _fragment(self, key, render):
+        """Return the fragment of ``key``, calling ``render`` if not cached."""
+        with self._lock:
+            fragment = self._cache.get(key)
+            if fragment is not None:
+                self._cache[key] = self._cache.pop(key)
+                return fragment
+        fragment = render()
+        with self._lock:
+            self._cache[key] = fragment
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return fragment
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Signal receivers keeping the editor services up to date."""
+
+from __future__ import absolute_import, print_function
+
+
+def index_record(sender, recid=None, record=None, **kwargs):
+    """Add a saved record to the search index of the sending application."""
+    state = sender.extensions.get('invenio-record-editor')
+    if state is not None and recid is not None:
+        state.search_index.index(recid, record or {})
+
+
+def fingerprint_record(sender, recid=None, record=None, **kwargs):
+    """Add a saved record to the duplicates index of the sending app."""
+    state = sender.extensions.get('invenio-record-editor')
+    if state is not None and recid is not None:
+        state.duplicates.index(recid, record or {})
+
+
+def normalize_record(sender, record=None, **kwargs):
+    """Apply the normalization rules to a record about to be saved."""
+    state = sender.extensions.get('invenio-record-editor')
+    if state is not None and record is not None and \
+            sender.config['RECORD_EDITOR_NORMALIZE_ON_SAVE']:
+        normalized, _ = state.normalizer.normalize(record)
+        record.update(normalized)
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Field-level normalization rules applied in a single pass over a record.
+
+Rules are declared per dotted field path, list indices being skipped, e.g.:
+
+.. code-block:: python
+
+    RECORD_EDITOR_NORMALIZATION_RULES = {
+        'titles.title': ['strip_whitespace'],
+        'authors': ['deduplicate_authors'],
+    }
+
+A rule is the name of a built-in rule, an import path or a function taking
+the value found under the path and returning its normalized version.
+"""
+
+from __future__ import absolute_import, print_function
+
+import re
+from functools import wraps
+
+from werkzeug.utils import import_string
+
+_string_types = (str, type(u''))
+
+
+def _string_rule(f):
+    """Apply a rule to a string, or to every string of a list."""
+    @wraps(f)
+    def decorated(value):
+        if isinstance(value, list):
+            return [decorated(item) for item in value]
+        if isinstance(value, _string_types):
+            return f(value)
+        return value
+    return decorated
+
+
+@_string_rule
+def strip(value):
+    """Strip the whitespace at both ends of a string."""
+    return value.strip()
+
+
+@_string_rule
+def strip_whitespace(value):
+    """Strip a string and collapse its inner whitespace."""
+    return u' '.join(value.split())
+
+
+_DOI_PREFIX_RE = re.compile(
+    r'^(doi:|https?://(dx\.)?doi\.org/)\s*', re.IGNORECASE)
+
+
+@_string_rule
+def normalize_doi(value):
+    """Remove the ``doi:`` or resolver prefix of a DOI."""
+    return _DOI_PREFIX_RE.sub(u'', value.strip())
+
+
+_ARXIV_PREFIX_RE = re.compile(
+    r'^(arxiv:|https?://arxiv\.org/(abs|pdf)/)\s*', re.IGNORECASE)
+
+
+@_string_rule
+def normalize_arxiv_id(value):
+    """Remove the ``arXiv:`` or URL prefix of an arXiv identifier."""
+    return _ARXIV_PREFIX_RE.sub(u'', value.strip())
+
+
+def _author_key(author):
+    """Return what identifies an author, ``None`` if nothing does."""
+    name = author.get('full_name') if isinstance(author, dict) else None
+    if name is None:
+        return None
+    ids = frozenset(
+        (identifier.get('schema'), identifier.get('value'))
+        for identifier in author.get('ids', ()) if isinstance(identifier, dict)
+    )
+    affiliations = frozenset(
+        affiliation.get('value')
+        for affiliation in author.get('affiliations', ())
+        if isinstance(affiliation, dict)
+    )
+    return u' '.join(name.lower().split()), ids, affiliations
+
+
+def deduplicate_authors(value):
+    """Remove the authors repeated in the list.
+
+    Authors are repeated when they have the same full name, identifiers and
+    affiliations, since different people of a large collaboration can share
+    the same name.
+    """
+    if not isinstance(value, list):
+        return value
+    seen = set()
+    authors = []
+    for author in value:
+        key = _author_key(author)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        authors.append(author)
+    return authors
+
+
+BUILTIN_RULES = {
+    'deduplicate_authors': deduplicate_authors,
+    'normalize_arxiv_id': normalize_arxiv_id,
+    'normalize_doi': normalize_doi,
+    'strip': strip,
+    'strip_whitespace': strip_whitespace,
+}
+"""Rules which can be referenced by name in the configuration."""
+
+
+def load_rule(rule):
+    """Return the function of a rule given by name, import path or value."""
+    if callable(rule):
+        return rule
+    if rule in BUILTIN_RULES:
+        return BUILTIN_RULES[rule]
+    return import_string(rule)
+
+
+class Normalizer(object):
+    """Normalization rules compiled into a dispatch table.
+
+    The table maps every field path to the rules applied to it, and the
+    record is walked once, descending only into the fields which lead to a
+    path with rules. Untouched subtrees are shared with the original
+    record, which is never modified.
+    """
+
+    def __init__(self, rules=None):
+        """Compile the rules.
+
+        :param rules: a dictionary mapping dotted field paths to lists of
+            rules.
+        """
+        self.dispatch = dict(
+            (path, tuple(load_rule(rule) for rule in path_rules))
+            for path, path_rules in (rules or {}).items() if path_rules
+        )
+        self._paths = set()
+        for path in self.dispatch:
+            parts = path.split('.')
+            for i in range(1, len(parts) + 1):
+                self._paths.add('.'.join(parts[:i]))
+
+    def normalize(self, record):
+        """Normalize a record.
+
+        :returns: a tuple ``(record, fixes)`` where ``fixes`` is the list of
+            JSON Patch ``replace`` operations turning the original record
+            into the normalized one.
+        """
+        fixes = []
+        return self._descend(record, '', (), fixes), fixes
+
+    def _descend(self, value, path, location, fixes):
+        if isinstance(value, dict):
+            changed = {}
+            for key, child in value.items():
+                child_path = path + '.' + key if path else key
+                if child_path in self._paths:
+                    new = self._normalize(
+                        child, child_path, location + (key,), fixes)
+                    if new is not child:
+                        changed[key] = new
+            if changed:
+                value = dict(value)
+                value.update(changed)
+        elif isinstance(value, list):
+            items = [self._descend(item, path, location + (index,), fixes)
+                     for index, item in enumerate(value)]
+            if any(new is not old for new, old in zip(items, value)):
+                value = items
+        return value
+
+    def _normalize(self, value, path, location, fixes):
+        value = self._descend(value, path, location, fixes)
+        rules = self.dispatch.get(path)
+        if rules:
+            new = value
+            for rule in rules:
+                new = rule(new)
+            if new != value:
+                fixes.append({
+                    'op': 'replace',
+                    'path': _json_pointer(location),
+                    'value': new,
+                })
+                return new
+        return value
+
+
+def _json_pointer(location):
+    return u''.join(
+        u'/' + u'{0}'.format(part).replace(u'~', u'~0').replace(u'/', u'~1')
+        for part in location)
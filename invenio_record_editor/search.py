@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""In-process inverted index used by the editor sidebar search."""
+
+from __future__ import absolute_import, print_function
+
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_values(record, path):
+    """Yield the values found under a dotted ``path`` of a record.
+
+    Lists are traversed transparently, so ``authors.full_name`` yields the
+    name of every author.
+    """
+    nodes = [record]
+    for key in path.split('.'):
+        found = []
+        for node in nodes:
+            if isinstance(node, dict) and key in node:
+                found.append(node[key])
+        nodes = []
+        for node in found:
+            if isinstance(node, (list, tuple)):
+                nodes.extend(node)
+            else:
+                nodes.append(node)
+    for node in nodes:
+        if isinstance(node, (list, tuple)):
+            for value in node:
+                yield value
+        elif node is not None:
+            yield node
+
+
+def tokenize(value):
+    """Split a value into lowercased terms."""
+    if isinstance(value, (dict, list, tuple)) or value is None:
+        return []
+    return _TOKEN_RE.findall(u'{0}'.format(value).lower())
+
+
+class RecordIndex(object):
+    """Inverted index over a configurable set of record fields.
+
+    Records are mapped to dense internal document numbers, so that every
+    postings list is a sorted ``array`` of unsigned integers. Multi-term
+    queries intersect the postings lists, starting from the shortest one.
+
+    The index lives in the memory of the process which created it, and is
+    empty until records are added with :meth:`index` or :meth:`bulk_index`.
+    """
+
+    def __init__(self, fields=None):
+        """Initialize the index.
+
+        :param fields: dotted paths of the record fields to index.
+        """
+        self.fields = tuple(fields or ())
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._docs = []
+        self._docnums = {}
+        self._terms = {}
+
+    def __len__(self):
+        """Return the number of indexed records."""
+        return len(self._docnums)
+
+    def extract_terms(self, record):
+        """Return the set of terms of a record."""
+        terms = set()
+        for field in self.fields:
+            for value in get_values(record, field):
+                terms.update(tokenize(value))
+        return terms
+
+    def index(self, recid, record):
+        """Add or replace a record in the index.
+
+        Only the postings lists of terms which were added or removed since
+        the previous version of the record are touched.
+        """
+        terms = self.extract_terms(record)
+        with self._lock:
+            self._index_terms(recid, terms)
+
+    def bulk_index(self, records):
+        """Add or replace many records in the index.
+
+        The terms of the records are extracted before the index is locked,
+        so that searches are only blocked while the postings are updated.
+
+        :param records: an iterable of ``(recid, record)`` pairs.
+        :returns: the number of records indexed.
+        """
+        documents = [(recid, self.extract_terms(record))
+                     for recid, record in records]
+        with self._lock:
+            for recid, terms in documents:
+                self._index_terms(recid, terms)
+        return len(documents)
+
+    def delete(self, recid):
+        """Remove a record from the index."""
+        with self._lock:
+            docnum = self._docnums.pop(recid, None)
+            if docnum is None:
+                return
+            for term in self._terms.pop(docnum, ()):
+                self._remove_posting(term, docnum)
+            self._docs[docnum] = None
+
+    def search(self, query, page=1, size=10):
+        """Search the index.
+
+        Every term of the query must match (``AND`` semantics). Hits are
+        returned in indexing order.
+
+        :param query: the query string.
+        :param page: the 1-based page number.
+        :param size: the number of hits per page.
+        :returns: a tuple ``(total, recids)``.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 0, []
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return 0, []
+            postings.sort(key=len)
+            result = postings[0]
+            for other in postings[1:]:
+                result = _intersect(result, other)
+                if not result:
+                    return 0, []
+            start = (page - 1) * size
+            hits = [self._docs[docnum]
+                    for docnum in result[start:start + size]]
+        return len(result), hits
+
+    def _index_terms(self, recid, terms):
+        docnum = self._docnums.get(recid)
+        if docnum is None:
+            docnum = len(self._docs)
+            self._docs.append(recid)
+            self._docnums[recid] = docnum
+        old_terms = self._terms.get(docnum, frozenset())
+        for term in old_terms - terms:
+            self._remove_posting(term, docnum)
+        for term in terms - old_terms:
+            self._add_posting(term, docnum)
+        self._terms[docnum] = frozenset(terms)
+
+    def _add_posting(self, term, docnum):
+        postings = self._postings.get(term)
+        if postings is None:
+            self._postings[term] = array('I', [docnum])
+        elif postings[-1] < docnum:
+            postings.append(docnum)
+        else:
+            postings.insert(bisect_left(postings, docnum), docnum)
+
+    def _remove_posting(self, term, docnum):
+        postings = self._postings[term]
+        del postings[bisect_left(postings, docnum)]
+        if not postings:
+            del self._postings[term]
+
+
+def _intersect(shorter, longer):
+    """Intersect two sorted postings lists."""
+    result = array('I')
+    lo = 0
+    hi = len(longer)
+    for docnum in shorter:
+        lo = bisect_left(longer, docnum, lo, hi)
+        if lo == hi:
+            break
+        if longer[lo] == docnum:
+            result.append(docnum)
+    return result
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Signals sent by the record editor."""
+
+from __future__ import absolute_import, print_function
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+before_record_save = _signals.signal('before-record-save')
+"""Signal sent before a record is saved through the editor.
+
+The sender is the current Flask application. Receivers may modify the
+record in place. Parameters:
+
+- ``recid`` - identifier of the record.
+- ``record`` - the record about to be saved (a JSON dictionary).
+"""
+
+record_saved = _signals.signal('record-saved')
+"""Signal sent after a record has been saved through the editor.
+
+The sender is the current Flask application. Parameters:
+
+- ``recid`` - identifier of the saved record.
+- ``record`` - the saved record (a JSON dictionary).
+
+Example receiver:
+
+.. code-block:: python
+
+    def receiver(sender, recid=None, record=None, **kwargs):
+        # ...
+"""
@@ -26,7 +26,12 @@
 
 from __future__ import absolute_import, print_function
 
-from flask import Blueprint, current_app, render_template
+from flask import Blueprint, current_app, jsonify, make_response, \
+    render_template, request, session
+
+from . import handlers
+from .limiter import EDITOR_SESSION_KEY, rate_limited
+from .proxies import current_record_editor
 
 blueprint = Blueprint(
     'invenio_record_editor',
@@ -41,4 +46,59 @@ blueprint = Blueprint(
 @blueprint.route('/<path:path>')
 def index(path):
     """Basic view."""
+    if current_app.secret_key:
+        session[EDITOR_SESSION_KEY] = True
     return render_template(current_app.config['RECORD_EDITOR_INDEX_TEMPLATE'])
+
+
+@blueprint.route('/api/search')
+def search():
+    """Search the records indexed by the editor."""
+    return jsonify(handlers.search(current_record_editor, request.args))
+
+
+@blueprint.route('/api/preview', methods=['POST', 'PATCH'])
+@rate_limited
+def preview():
+    """Render a record as published.
+
+    ``POST`` renders the record in the request body. ``PATCH`` renders a
+    record previewed earlier with the same ``recid`` query argument updated
+    with the JSON Patch in the request body. The ``ETag`` of every preview
+    is the version of its record, which the ``If-Match`` header of a
+    ``PATCH`` must name. Records are kept by each worker, so ``PATCH``
+    answers ``409`` when the worker does not have this version, in which
+    case the client posts the whole record again.
+    """
+    html, version = handlers.preview(
+        current_record_editor, request.method, request.args,
+        request.get_json(silent=True), request.if_match)
+    response = make_response(html)
+    response.set_etag(version)
+    return response
+
+
+@blueprint.route('/api/fixes', methods=['POST'])
+@rate_limited
+def suggest_fixes():
+    """Return the normalization fixes for the record in the request body."""
+    return jsonify(handlers.suggest_fixes(
+        current_record_editor, request.get_json(silent=True)))
+
+
+@blueprint.route('/api/duplicates', methods=['POST'])
+@rate_limited
+def duplicates():
+    """Return the likely duplicates of the record in the request body.
+
+    The ``recid`` query argument excludes the record itself from the
+    candidates.
+    """
+    return jsonify(handlers.duplicates(
+        current_record_editor, request.args, request.get_json(silent=True)))
+
+
+@blueprint.route('/api/metrics')
+def metrics():
+    """Return the rate limiter queue depths and rejection counts."""
+    return jsonify(handlers.metrics(current_record_editor))
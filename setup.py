@@ -59,7 +59,9 @@ setup_requires = [
 
 install_requires = [
     'Flask>=0.11.1',
+    'blinker>=1.4',
     'invenio-assets>=1.0.0b3',
+    'jsonpatch>=1.15',
 ]
 
 packages = find_packages()
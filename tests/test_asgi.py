@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""ASGI application tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+import sys
+
+import pytest
+from flask import request
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.limiter import BULK, INTERACTIVE
+from invenio_record_editor.signals import record_saved
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 5), reason='requires Python 3.5 or later')
+
+
+def run(application, scope, messages):
+    """Run an ASGI application, return the messages it sent."""
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    sent = []
+
+    def done(result=None):
+        future = loop.create_future()
+        future.set_result(result)
+        return future
+
+    def receive():
+        return done(messages.pop(0))
+
+    def send(message):
+        sent.append(message)
+        return done()
+
+    try:
+        loop.run_until_complete(application(scope, receive, send))
+    finally:
+        loop.close()
+    return sent
+
+
+def call(application, method, path, body=None, headers=None):
+    """Send a request to an ASGI application and return the response."""
+    path, _, query_string = path.partition('?')
+    headers = dict(headers or {})
+    if body is not None:
+        headers.setdefault('Content-Type', 'application/json')
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string.encode('latin-1'),
+        'headers': [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                    for key, value in headers.items()],
+        'client': ('127.0.0.1', 1234),
+    }
+    body = (json.dumps(body) if body is not None else '').encode('utf-8')
+    # Send the body in two chunks, like a slow client would.
+    messages = [
+        {'type': 'http.request', 'body': body[:5], 'more_body': True},
+        {'type': 'http.request', 'body': body[5:], 'more_body': False},
+    ]
+    start, body = run(application, scope, messages)
+    headers = dict((key.decode('latin-1'), value.decode('latin-1'))
+                   for key, value in start['headers'])
+    return start['status'], headers, body['body'].decode('utf-8')
+
+
+def header_priority_class():
+    """Classify requests on the priority header only."""
+    if request.headers.get('X-Record-Editor-Priority') == BULK:
+        return BULK
+    return INTERACTIVE
+
+
+@pytest.fixture()
+def asgi_app(app):
+    """ASGI application fixture."""
+    from invenio_record_editor.asgi import create_asgi_app
+
+    app.config.update(
+        RECORD_EDITOR_RATE_LIMITS={
+            'suggest_fixes': {'bulk': {'rate': 0.1, 'burst': 1}},
+        },
+        RECORD_EDITOR_PRIORITY_CLASS_GETTER=header_priority_class,
+    )
+    InvenioRecordEditor(app)
+    return create_asgi_app(app)
+
+
+def test_search(app, asgi_app):
+    """Test the search endpoint."""
+    record_saved.send(app, recid=1,
+                      record={'titles': [{'title': 'Higgs boson'}]})
+    status, headers, body = call(asgi_app, 'GET',
+                                 '/editor/api/search?q=higgs&page=x')
+    assert status == 200
+    assert headers['content-type'] == 'application/json'
+    assert json.loads(body) == {'total': 1, 'hits': [1], 'page': 1,
+                                'size': 10}
+
+    status, _, _ = call(asgi_app, 'GET', '/editor/api/search?size=0')
+    assert status == 400
+
+
+def test_post_endpoints(app, asgi_app):
+    """Test the endpoints receiving a record."""
+    record = {'titles': [{'title': ' Higgs boson '}]}
+    record_saved.send(app, recid=1, record=record)
+
+    status, _, body = call(asgi_app, 'POST', '/editor/api/preview', record)
+    assert status == 200
+    assert 'Higgs boson' in body
+
+    status, _, body = call(asgi_app, 'POST', '/editor/api/fixes', record)
+    assert status == 200
+    assert json.loads(body)['record'] == {
+        'titles': [{'title': 'Higgs boson'}]}
+
+    status, _, body = call(asgi_app, 'POST', '/editor/api/duplicates',
+                           record)
+    assert status == 200
+    assert json.loads(body)['hits'] == [{'recid': 1, 'similarity': 1.0}]
+
+    status, _, _ = call(asgi_app, 'POST', '/editor/api/fixes', [1])
+    assert status == 400
+    status, _, _ = call(asgi_app, 'GET', '/editor/api/fixes')
+    assert status == 405
+    status, _, _ = call(asgi_app, 'GET', '/editor/api/missing')
+    assert status == 404
+    status, _, _ = call(asgi_app, 'GET', '/other')
+    assert status == 404
+
+
+def test_preview_patch(app, asgi_app):
+    """Test applying a JSON Patch to a previewed record."""
+    record = {'titles': [{'title': 'Higgs boson'}]}
+    status, headers, _ = call(asgi_app, 'POST',
+                              '/editor/api/preview?recid=1', record)
+    assert status == 200
+    etag = headers['etag']
+    patch = [{'op': 'replace', 'path': '/titles/0/title',
+              'value': 'Top quark'}]
+    status, headers, body = call(asgi_app, 'PATCH',
+                                 '/editor/api/preview?recid=1', patch,
+                                 {'If-Match': etag})
+    assert status == 200
+    assert 'Top quark' in body
+    assert headers['etag'] != etag
+    status, _, _ = call(asgi_app, 'PATCH', '/editor/api/preview?recid=2',
+                        patch, {'If-Match': etag})
+    assert status == 409
+    status, _, _ = call(asgi_app, 'PATCH', '/editor/api/preview?recid=1',
+                        patch)
+    assert status == 428
+    status, _, _ = call(asgi_app, 'PATCH', '/editor/api/preview?recid=1',
+                        [{'op': 'replace', 'path': '', 'value': [1]}],
+                        {'If-Match': etag})
+    assert status == 400
+
+
+def test_max_content_length(app, asgi_app):
+    """Test that bodies above ``MAX_CONTENT_LENGTH`` get a 413."""
+    app.config['MAX_CONTENT_LENGTH'] = 10
+    record = {'titles': [{'title': 'Higgs boson'}]}
+    status, _, _ = call(asgi_app, 'POST', '/editor/api/fixes', record,
+                        {'Content-Length': '40'})
+    assert status == 413
+    # Without a length, the body is checked while it is read.
+    status, _, _ = call(asgi_app, 'POST', '/editor/api/fixes', record)
+    assert status == 413
+
+
+def test_disconnect(asgi_app):
+    """Test that no response is sent to a client gone mid-body."""
+    scope = {'type': 'http', 'method': 'POST', 'path': '/editor/api/fixes',
+             'query_string': b'', 'headers': [], 'client': None}
+    messages = [
+        {'type': 'http.request', 'body': b'{', 'more_body': True},
+        {'type': 'http.disconnect'},
+    ]
+    assert run(asgi_app, scope, messages) == []
+    metrics = asgi_app.state.limiter.metrics()
+    assert metrics['suggest_fixes']['interactive']['in_flight'] == 0
+
+
+def test_rate_limits(asgi_app):
+    """Test that the ASGI endpoints share the editor rate limits."""
+    headers = {'X-Record-Editor-Priority': 'bulk'}
+    status, _, _ = call(asgi_app, 'POST', '/editor/api/fixes', {}, headers)
+    assert status == 200
+    status, headers, _ = call(asgi_app, 'POST', '/editor/api/fixes', {},
+                              headers)
+    assert status == 429
+    assert headers['retry-after'] == '10'
+
+    status, _, body = call(asgi_app, 'GET', '/editor/api/metrics')
+    metrics = json.loads(body)['limiter']
+    assert metrics['suggest_fixes']['bulk']['rejected_rate'] == 1
+
+
+def test_rate_limits_before_body(asgi_app):
+    """Test that rejected requests are answered without reading them."""
+    scope = {'type': 'http', 'method': 'POST', 'path': '/editor/api/fixes',
+             'query_string': b'', 'client': ('127.0.0.1', 1234),
+             'headers': [(b'x-record-editor-priority', b'bulk')]}
+    call(asgi_app, 'POST', '/editor/api/fixes', {},
+         {'X-Record-Editor-Priority': 'bulk'})
+    messages = [{'type': 'http.request', 'body': b'{}'}]
+    start, _ = run(asgi_app, scope, messages)
+    assert start['status'] == 429
+    assert len(messages) == 1
+
+
+def test_admission_control(app):
+    """Test that requests above the concurrency limit get a 429."""
+    from invenio_record_editor.asgi import create_asgi_app
+
+    app.config.update(
+        RECORD_EDITOR_CONCURRENCY_LIMITS={'preview': {'bulk': 0}},
+        RECORD_EDITOR_ADMISSION_TIMEOUT=0,
+    )
+    InvenioRecordEditor(app)
+    status, headers, _ = call(create_asgi_app(app), 'POST',
+                              '/editor/api/preview', {})
+    assert status == 429
+    assert headers['retry-after'] == '1'
+
+
+def test_websocket(asgi_app):
+    """Test that WebSocket connections are closed."""
+    scope = {'type': 'websocket', 'path': '/editor/api/preview',
+             'query_string': b'', 'headers': []}
+    sent = run(asgi_app, scope, [{'type': 'websocket.connect'}])
+    assert sent == [{'type': 'websocket.close', 'code': 1000}]
+
+    with pytest.raises(ValueError):
+        run(asgi_app, {'type': 'unknown'}, [])
+
+
+def test_lifespan(asgi_app):
+    """Test the lifespan protocol."""
+    sent = run(asgi_app, {'type': 'lifespan'},
+               [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    assert [message['type'] for message in sent] == [
+        'lifespan.startup.complete', 'lifespan.shutdown.complete']
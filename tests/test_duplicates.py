@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Duplicate detection tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+import os
+
+import pytest
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.duplicates import DuplicateIndex
+from invenio_record_editor.signals import record_saved
+
+FIELDS = ['titles.title', 'dois.value', 'authors.full_name']
+
+HIGGS = {
+    'titles': [{'title': 'Observation of a new boson at a mass of 125 GeV '
+                         'with the CMS experiment at the LHC'}],
+    'authors': [{'full_name': 'Chatrchyan, S.'},
+                {'full_name': 'Khachatryan, V.'}],
+    'dois': [{'value': '10.1016/j.physletb.2012.08.021'}],
+}
+
+OTHER = {
+    'titles': [{'title': 'Measurement of the top quark mass'}],
+    'authors': [{'full_name': 'Ellis, John'}],
+}
+
+
+def test_candidates():
+    """Test that similar records are reported."""
+    index = DuplicateIndex(FIELDS)
+    index.index(1, HIGGS)
+    index.index('two', OTHER)
+    assert len(index) == 2
+
+    imported = dict(HIGGS, titles=[{
+        'title': 'Observation of a new boson at a mass of 125 GeV '
+                 'with the CMS experiment'}])
+    candidates = index.candidates(imported)
+    assert [recid for recid, _ in candidates] == [1]
+    assert 0.5 <= candidates[0][1] < 1
+
+    assert index.candidates(HIGGS) == [(1, 1.0)]
+    assert index.candidates(HIGGS, exclude='1') == []
+    assert index.candidates({}) == []
+    assert index.candidates(OTHER) == [('two', 1.0)]
+
+
+def test_update_delete():
+    """Test that saving a record again replaces its signature."""
+    index = DuplicateIndex(FIELDS)
+    index.index(1, HIGGS)
+    index.index(1, OTHER)
+    assert index.candidates(HIGGS) == []
+    assert index.candidates(OTHER) == [(1, 1.0)]
+    index.delete(1)
+    index.delete(2)
+    assert len(index) == 0
+    assert index.candidates(OTHER) == []
+
+
+def test_growth():
+    """Test that the map grows with the number of records."""
+    index = DuplicateIndex(FIELDS)
+    for recid in range(50):
+        index.index(recid, {'titles': [{'title': 'Record {0}'.format(recid)}]})
+    assert len(index) == 50
+    assert index.candidates({'titles': [{'title': 'Record 42'}]})[0] == \
+        (42, 1.0)
+
+
+def test_persistence(tmpdir):
+    """Test that signatures are loaded from and shared through the file."""
+    path = str(tmpdir.join('duplicates.idx'))
+    index = DuplicateIndex(FIELDS, path=path)
+    other = DuplicateIndex(FIELDS, path=path)
+    index.index(1, HIGGS)
+    for recid in range(2, 20):
+        index.index(recid, {'titles': [{'title': 'Record {0}'.format(recid)}]})
+    assert other.candidates(HIGGS) == [(1, 1.0)]
+    other.index(1, OTHER)
+    assert index.candidates(HIGGS) == []
+    index.close()
+    other.close()
+
+    index = DuplicateIndex(FIELDS, path=path)
+    assert len(index) == 19
+    assert index.candidates(OTHER) == [(1, 1.0)]
+    index.close()
+
+    with pytest.raises(ValueError):
+        DuplicateIndex(FIELDS, num_perm=32, bands=8, path=path)
+    with pytest.raises(ValueError):
+        DuplicateIndex(FIELDS, num_perm=64, bands=10)
+
+
+def test_duplicates_view(app):
+    """Test the duplicates endpoint."""
+    InvenioRecordEditor(app)
+    record_saved.send(app, recid=1, record=HIGGS)
+    with app.test_client() as client:
+        res = client.post('/editor/api/duplicates', data=json.dumps(HIGGS),
+                          content_type='application/json')
+        assert res.status_code == 200
+        data = json.loads(res.get_data(as_text=True))
+        assert data['hits'] == [{'recid': 1, 'similarity': 1.0}]
+
+        res = client.post('/editor/api/duplicates?recid=1',
+                          data=json.dumps(HIGGS),
+                          content_type='application/json')
+        assert json.loads(res.get_data(as_text=True))['hits'] == []
+
+
+def test_max_values():
+    """Test that only the first values of a field are compared."""
+    index = DuplicateIndex(['authors.full_name'], max_values=2)
+    authors = [{'full_name': 'Author, Name{0}'.format(i)} for i in range(10)]
+    index.index(1, {'authors': authors})
+    assert index.candidates({'authors': authors[:2]}) == [(1, 1.0)]
+    assert index.candidates({'authors': authors[2:]}) == []
+
+
+def test_shared_prefixes():
+    """Test that records sharing only DOI prefixes and initials differ."""
+    index = DuplicateIndex(FIELDS)
+    first = {
+        'titles': [{'title': 'Search for dark matter in monojet events'}],
+        'dois': [{'value': '10.1103/PhysRevD.91.012008'}],
+        'authors': [{'full_name': 'Ellis, J.'}],
+    }
+    second = {
+        'titles': [{'title': 'Lattice study of the QCD phase diagram'}],
+        'dois': [{'value': '10.1103/PhysRevD.91.054503'}],
+        'authors': [{'full_name': 'Fodor, Z.'}],
+    }
+    first_bands = index._band_keys(index.signature(first))
+    second_bands = index._band_keys(index.signature(second))
+    assert not set(first_bands) & set(second_bands)
+
+
+def test_superseded_entries():
+    """Test that superseded entries leave the buckets and are compacted."""
+    index = DuplicateIndex(FIELDS)
+    index.compact_threshold = 10
+    index.index(2, OTHER)
+    for _ in range(10):
+        index.index(1, HIGGS)
+    assert sum(len(bucket) for bucket in index._buckets.values()) == 32
+    assert len(index._recids) == 11
+
+    index.index(1, HIGGS)
+    assert len(index._recids) == 2
+    assert index.candidates(HIGGS) == [(1, 1.0)]
+    assert index.candidates(OTHER) == [(2, 1.0)]
+
+
+def test_compaction_shared(tmpdir):
+    """Test that other processes reopen a compacted file."""
+    path = str(tmpdir.join('duplicates.idx'))
+    index = DuplicateIndex(FIELDS, path=path)
+    other = DuplicateIndex(FIELDS, path=path)
+    for _ in range(20):
+        index.index(1, HIGGS)
+    assert other.candidates(HIGGS) == [(1, 1.0)]
+    size = os.path.getsize(path)
+
+    index.compact()
+    assert os.path.getsize(path) < size
+    other.index(2, OTHER)
+    assert len(other._recids) == 2
+    assert index.candidates(OTHER) == [(2, 1.0)]
+    assert index.candidates(HIGGS) == [(1, 1.0)]
+    index.close()
+    other.close()
+
+    index = DuplicateIndex(FIELDS, path=path)
+    assert len(index) == 2
+    index.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_forked_writers(tmpdir):
+    """Test that workers forked after loading do not overwrite entries."""
+    path = str(tmpdir.join('duplicates.idx'))
+    index = DuplicateIndex(FIELDS, path=path)
+    index.index('parent', HIGGS)
+
+    workers = 4
+    pids = []
+    for worker in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                for i in range(50):
+                    index.index('{0}-{1}'.format(worker, i), {
+                        'titles': [{'title': 'Worker {0} record {1}'.format(
+                            worker, i)}]})
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    index.close()
+
+    index = DuplicateIndex(FIELDS, path=path)
+    assert len(index) == 1 + workers * 50
+    index.close()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Rate limiting and admission control tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.limiter import EDITOR_SESSION_KEY, \
+    AdmissionController, MemoryStore, RateLimiter, SQLiteStore
+
+
+def _test_store(store):
+    assert store.consume('key', 1, 2, now=0) == 0
+    assert store.consume('key', 1, 2, now=0) == 0
+    assert store.consume('key', 1, 2, now=0) == 1
+    assert store.consume('key', 1, 2, now=0.5) == 0.5
+    assert store.consume('key', 1, 2, now=1) == 0
+    assert store.consume('other', 1, 2, now=1) == 0
+
+
+def test_memory_store():
+    """Test the in-process token buckets."""
+    _test_store(MemoryStore())
+
+
+def test_memory_store_prune():
+    """Test that full buckets are discarded."""
+    store = MemoryStore()
+    store.max_keys = 2
+    store.consume('a', 1, 1, now=0)
+    store.consume('b', 1, 1, now=0)
+    store.consume('c', 1, 1, now=10)
+    assert list(store._buckets) == ['c']
+
+
+def test_sqlite_store(tmpdir):
+    """Test the token buckets shared through SQLite."""
+    path = str(tmpdir.join('limits.db'))
+    _test_store(SQLiteStore(path))
+    assert SQLiteStore(path).consume('other', 1, 2, now=1) == 0
+    assert SQLiteStore(path).consume('other', 1, 2, now=1) == 1
+
+
+def test_sqlite_store_prune(tmpdir):
+    """Test that full buckets are removed from the file."""
+    path = str(tmpdir.join('limits.db'))
+    store = SQLiteStore(path)
+    store.consume('a', 1, 1, now=store._pruned_at)
+    store.consume('b', 1, 1, now=store._pruned_at + 100)
+    keys = sqlite3.connect(path).execute('SELECT key FROM buckets')
+    assert [key for key, in keys] == ['b']
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_sqlite_store_fork(tmpdir):
+    """Test that forked workers open their own connection."""
+    path = str(tmpdir.join('limits.db'))
+    store = SQLiteStore(path)
+    assert not os.path.exists(path)
+    store.consume('parent', 1, 1, now=0)
+    parent = store._connection()
+
+    workers = 4
+    pids = []
+    for worker in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                if store._connection() is not parent:
+                    for i in range(20):
+                        store.consume('worker', 0.001, 100, now=0)
+                    status = 0
+            finally:
+                os._exit(status)
+        pids.append(pid)
+    for pid in pids:
+        assert os.waitpid(pid, 0)[1] == 0
+    assert store._connection() is parent
+    tokens, = parent.execute(
+        "SELECT tokens FROM buckets WHERE key = 'worker'").fetchone()
+    assert tokens == 100 - workers * 20
+
+
+def test_admission_controller():
+    """Test that requests above the concurrency limit are rejected."""
+    controller = AdmissionController(1, timeout=0.01)
+    assert controller.acquire()
+    assert not controller.acquire()
+    assert controller.rejected == 1
+    assert controller.queued == 0
+    controller.release()
+    assert controller.acquire()
+
+    released = threading.Timer(0.05, controller.release)
+    controller.timeout = 5
+    released.start()
+    assert controller.acquire()
+    assert controller.in_flight == 1
+
+
+def test_rate_limiter_metrics():
+    """Test the limiter metrics."""
+    limiter = RateLimiter(
+        rate_limits={'preview': {'bulk': {'rate': 1, 'burst': 1}}},
+        concurrency_limits={'preview': {'interactive': 1}})
+    assert limiter.check_rate('preview', 'interactive', 'a') == 0
+    assert limiter.check_rate('preview', 'bulk', 'a') == 0
+    assert limiter.check_rate('preview', 'bulk', 'a') > 0
+    assert limiter.metrics() == {'preview': {
+        'interactive': {'in_flight': 0, 'queued': 0,
+                        'rejected_concurrency': 0, 'rejected_rate': 0},
+        'bulk': {'in_flight': 0, 'queued': 0,
+                 'rejected_concurrency': 0, 'rejected_rate': 1},
+    }}
+    assert dict(limiter._rate_rejected) == {('preview', 'bulk'): 1}
+
+
+def test_rate_limited_view(app):
+    """Test that limited requests get a 429 with ``Retry-After``."""
+    app.config.update(
+        RECORD_EDITOR_RATE_LIMITS={
+            'preview': {'bulk': {'rate': 0.1, 'burst': 1}},
+        },
+        SECRET_KEY='secret',
+    )
+    InvenioRecordEditor(app)
+    data = json.dumps({'titles': [{'title': 'Higgs boson'}]})
+    with app.test_client() as client:
+        def post(priority=None):
+            return client.post(
+                '/editor/api/preview', data=data,
+                content_type='application/json',
+                headers={'X-Record-Editor-Priority': priority or ''})
+
+        assert post('bulk').status_code == 200
+        res = post('bulk')
+        assert res.status_code == 429
+        assert res.headers['Retry-After'] == '10'
+
+        with client.session_transaction() as session:
+            session[EDITOR_SESSION_KEY] = True
+        assert post().status_code == 200
+        assert post('bulk').status_code == 429
+
+        res = client.get('/editor/api/metrics')
+        metrics = json.loads(res.get_data(as_text=True))['limiter']
+        assert metrics['preview']['bulk']['rejected_rate'] == 2
+
+
+def test_unclassified_clients(app):
+    """Test that clients without an editor session get the bulk quota."""
+    app.config.update(
+        RECORD_EDITOR_RATE_LIMITS={
+            'preview': {'bulk': {'rate': 0.1, 'burst': 1}},
+        },
+        SECRET_KEY='secret',
+    )
+    InvenioRecordEditor(app)
+    data = json.dumps({'titles': [{'title': 'Higgs boson'}]})
+    with app.test_client() as client:
+        def post(priority=None):
+            headers = {'X-Record-Editor-Priority': priority} \
+                if priority else {}
+            return client.post('/editor/api/preview', data=data,
+                               content_type='application/json',
+                               headers=headers)
+
+        assert post().status_code == 200
+        assert post().status_code == 429
+        assert post('interactive').status_code == 429
+
+        res = client.get('/editor/api/metrics')
+        metrics = json.loads(res.get_data(as_text=True))['limiter']
+        assert metrics['preview']['bulk']['rejected_rate'] == 2
+        assert metrics['preview']['interactive']['rejected_rate'] == 0
+
+
+def test_admission_control_view(app):
+    """Test that requests above the concurrency limit get a 429."""
+    app.config.update(
+        RECORD_EDITOR_CONCURRENCY_LIMITS={'preview': {'bulk': 0}},
+        RECORD_EDITOR_ADMISSION_TIMEOUT=0,
+    )
+    InvenioRecordEditor(app)
+    with app.test_client() as client:
+        res = client.post('/editor/api/preview', data='{}',
+                          content_type='application/json')
+        assert res.status_code == 429
+        assert res.headers['Retry-After'] == '1'
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Preview tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+
+import pytest
+from flask import template_rendered
+from jsonpatch import JsonPatchException
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.limiter import EDITOR_SESSION_KEY
+from invenio_record_editor.preview import PreviewRenderer, subtree_hash
+from invenio_record_editor.proxies import current_record_editor
+
+
+def test_subtree_hash():
+    """Test that the subtree hash ignores key order."""
+    assert subtree_hash({'a': 1, 'b': [1, 2]}) == \
+        subtree_hash({'b': [1, 2], 'a': 1})
+    assert subtree_hash({'a': 1}) != subtree_hash({'a': 2})
+
+
+def _record_fragments(rendered):
+    def receiver(sender, template, context, **extra):
+        if 'item' in context:
+            rendered.append(json.dumps(context['item'], sort_keys=True))
+        elif 'value' in context:
+            rendered.append(context['field'])
+    return receiver
+
+
+def test_render_fragments_cached(app):
+    """Test that only changed fields and items are rendered again."""
+    InvenioRecordEditor(app)
+    rendered = []
+    record = {
+        'control_number': 1,
+        'titles': [{'title': 'Higgs boson'}],
+        'authors': [{'full_name': 'Ellis, John'},
+                    {'full_name': 'Higgs, Peter'}],
+    }
+    with app.test_request_context():
+        with template_rendered.connected_to(_record_fragments(rendered), app):
+            renderer = current_record_editor.preview_renderer
+            html, _ = renderer.render(record)
+            assert 'Higgs boson' in html
+            assert 'Ellis, John' in html
+            assert len(rendered) == 4
+
+            del rendered[:]
+            record['authors'][1] = {'full_name': 'Englert, Francois'}
+            html, _ = renderer.render(record)
+            assert 'Englert, Francois' in html
+            assert 'Ellis, John' in html
+            assert rendered == ['{"full_name": "Englert, Francois"}']
+
+
+def test_render_chunks(app):
+    """Test that list items are assembled in cached chunks."""
+    InvenioRecordEditor(app)
+    chunks = []
+
+    def receiver(sender, template, context, **extra):
+        if template.name.endswith('chunk.html'):
+            chunks.append(len(context['fragments']))
+
+    authors = [{'full_name': 'Author, {0}'.format(i)} for i in range(5)]
+    with app.test_request_context():
+        with template_rendered.connected_to(receiver, app):
+            renderer = current_record_editor.preview_renderer
+            renderer.chunk_size = 2
+            html, _ = renderer.render({'authors': authors})
+            assert chunks == [2, 2, 1]
+            assert html.index('Author, 0') < html.index('Author, 4')
+
+            del chunks[:]
+            authors[3] = {'full_name': 'Englert, Francois'}
+            html, _ = renderer.render({'authors': authors})
+            assert chunks == [2]
+            assert 'Author, 3' not in html
+            assert 'Englert, Francois' in html
+
+
+def test_render_patch(app):
+    """Test that patches only hash and render the touched fields."""
+    InvenioRecordEditor(app)
+    rendered = []
+    record = {
+        'control_number': 1,
+        'authors': [{'full_name': 'Ellis, John'},
+                    {'full_name': 'Higgs, Peter'}],
+    }
+    with app.test_request_context():
+        with template_rendered.connected_to(_record_fragments(rendered), app):
+            renderer = current_record_editor.preview_renderer
+            _, version = renderer.render(record, recid='1')
+            del rendered[:]
+
+            html, patched = renderer.render_patch('1', [
+                {'op': 'replace', 'path': '/authors/1/full_name',
+                 'value': 'Englert, Francois'},
+                {'op': 'add', 'path': '/control_number', 'value': 2},
+            ], version)
+            assert 'Englert, Francois' in html
+            assert sorted(rendered) == [
+                'control_number', '{"full_name": "Englert, Francois"}']
+            assert record['authors'][1] == {'full_name': 'Higgs, Peter'}
+            assert patched != version
+
+            html, moved = renderer.render_patch('1', [
+                {'op': 'move', 'from': '/authors/0', 'path': '/authors/-'},
+            ], patched)
+            assert html.index('Ellis, John') > html.index('Englert')
+
+            # Versions are kept side by side and identify the content.
+            _, unpatched = renderer.render_patch('1', [], version)
+            assert unpatched == version
+            assert renderer.render(record)[1] == version
+
+            with pytest.raises(KeyError):
+                renderer.render_patch('2', [], version)
+            with pytest.raises(KeyError):
+                renderer.render_patch('1', [], 'unknown')
+            with pytest.raises(JsonPatchException):
+                renderer.render_patch('1', [{'op': 'unknown', 'path': '/a'}],
+                                      version)
+            with pytest.raises(JsonPatchException):
+                renderer.render_patch('1', ['replace'], version)
+            with pytest.raises(JsonPatchException):
+                renderer.render_patch('1', [
+                    {'op': 'replace', 'path': '', 'value': [1]}], version)
+
+
+def test_render_patch_other_version(app):
+    """Test that a patch is never applied to another version of a record."""
+    InvenioRecordEditor(app)
+    first = {'titles': [{'title': 'Higgs boson'}],
+             'abstracts': [{'value': 'Old abstract.'}]}
+    second = {'titles': [{'title': 'Higgs boson'}],
+              'abstracts': [{'value': 'New abstract.'}]}
+    patch = [{'op': 'replace', 'path': '/titles/0/title',
+              'value': 'Top quark'}]
+    with app.test_request_context():
+        renderer = current_record_editor.preview_renderer
+        # Two workers, each holding the version previewed by a client.
+        workers = [renderer, PreviewRenderer(
+            renderer.template, renderer.field_template,
+            renderer.list_template, renderer.item_template)]
+        _, version = workers[0].render(second, recid='1')
+        workers[1].render(first, recid='1')
+        with pytest.raises(KeyError):
+            workers[1].render_patch('1', patch, version)
+
+        workers[1].render(second, recid='1')
+        html, _ = workers[1].render_patch('1', patch, version)
+        assert 'Top quark' in html
+        assert 'New abstract.' in html
+
+
+def test_preview_view(app):
+    """Test the preview endpoint."""
+    app.config['SECRET_KEY'] = 'secret'
+    InvenioRecordEditor(app)
+    patch = json.dumps([{'op': 'add', 'path': '/titles/-',
+                         'value': {'title': 'Top quark'}}])
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session[EDITOR_SESSION_KEY] = True
+        res = client.post(
+            '/editor/api/preview',
+            data=json.dumps({'titles': [{'title': 'Higgs boson'}]}),
+            content_type='application/json')
+        assert res.status_code == 200
+        assert 'Higgs boson' in res.get_data(as_text=True)
+        version = res.get_etag()[0]
+
+        res = client.post('/editor/api/preview', data=json.dumps([1, 2]),
+                          content_type='application/json')
+        assert res.status_code == 400
+
+        res = client.patch(
+            '/editor/api/preview?recid=1', data=patch,
+            content_type='application/json-patch+json',
+            headers={'If-Match': '"{0}"'.format(version)})
+        assert res.status_code == 409
+
+        res = client.post(
+            '/editor/api/preview?recid=1',
+            data=json.dumps({'titles': [{'title': 'Higgs boson'}]}),
+            content_type='application/json')
+        assert res.get_etag()[0] == version
+        res = client.patch(
+            '/editor/api/preview?recid=1', data=patch,
+            content_type='application/json-patch+json')
+        assert res.status_code == 428
+        res = client.patch(
+            '/editor/api/preview?recid=1', data=patch,
+            content_type='application/json-patch+json',
+            headers={'If-Match': '"{0}"'.format(version)})
+        assert res.status_code == 200
+        assert 'Top quark' in res.get_data(as_text=True)
+        assert res.get_etag()[0] != version
+
+        res = client.patch(
+            '/editor/api/preview?recid=1',
+            data=json.dumps([{'op': 'remove', 'path': '/missing'}]),
+            content_type='application/json-patch+json',
+            headers={'If-Match': '"{0}"'.format(version)})
+        assert res.status_code == 400
+
+        res = client.patch(
+            '/editor/api/preview?recid=1',
+            data=json.dumps([{'op': 'replace', 'path': '', 'value': [1]}]),
+            content_type='application/json-patch+json',
+            headers={'If-Match': '"{0}"'.format(version)})
+        assert res.status_code == 400
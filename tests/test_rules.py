@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Normalization rules tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+
+import pytest
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.rules import Normalizer, deduplicate_authors, \
+    normalize_arxiv_id, normalize_doi, strip, strip_whitespace
+from invenio_record_editor.signals import before_record_save
+
+
+def test_builtin_rules():
+    """Test the built-in rules."""
+    assert strip_whitespace('  Higgs \n boson ') == 'Higgs boson'
+    assert strip_whitespace([' a ', 1]) == ['a', 1]
+    assert strip_whitespace(1) == 1
+    assert strip(' First.\n\nSecond. ') == 'First.\n\nSecond.'
+    assert normalize_doi('doi:10.1/abc') == '10.1/abc'
+    assert normalize_doi('https://dx.doi.org/10.1/abc') == '10.1/abc'
+    assert normalize_doi('HTTPS://doi.org/ 10.1/abc') == '10.1/abc'
+    assert normalize_arxiv_id('arXiv:1207.7214') == '1207.7214'
+    assert normalize_arxiv_id('https://arxiv.org/abs/hep-th/9901001v2') \
+        == 'hep-th/9901001v2'
+    assert deduplicate_authors([
+        {'full_name': 'Ellis, John'},
+        {'full_name': 'ellis,  john'},
+        {'affiliations': []},
+        {'full_name': 'Higgs, Peter'},
+    ]) == [
+        {'full_name': 'Ellis, John'},
+        {'affiliations': []},
+        {'full_name': 'Higgs, Peter'},
+    ]
+
+
+def test_deduplicate_authors_homonyms():
+    """Test that different authors sharing a name are kept."""
+    authors = [
+        {'full_name': 'Wang, Y.', 'affiliations': [{'value': 'IHEP'}]},
+        {'full_name': 'Wang, Y.', 'affiliations': [{'value': 'Tsinghua'}]},
+        {'full_name': 'Wang, Y.', 'affiliations': [{'value': 'IHEP'}],
+         'ids': [{'schema': 'ORCID', 'value': '0000-0001'}]},
+        {'full_name': 'Wang, Y.', 'affiliations': [{'value': 'IHEP'}],
+         'ids': [{'schema': 'ORCID', 'value': '0000-0002'}]},
+    ]
+    assert deduplicate_authors(authors) == authors
+    assert deduplicate_authors(authors + authors[1:2]) == authors
+
+
+def test_normalizer():
+    """Test that the record is normalized in a single pass."""
+    normalizer = Normalizer({
+        'titles.title': ['strip_whitespace'],
+        'authors.full_name': ['strip_whitespace'],
+        'authors': ['deduplicate_authors'],
+        'dois.value': ['normalize_doi', lambda value: value.lower()],
+        'empty': [],
+    })
+    record = {
+        'titles': [{'title': ' Higgs boson '}],
+        'authors': [{'full_name': 'Ellis, John '},
+                    {'full_name': 'Ellis, John'}],
+        'dois': [{'value': '10.1/ABC'}],
+        'abstracts': [{'value': ' untouched '}],
+    }
+    normalized, fixes = normalizer.normalize(record)
+
+    assert normalized == {
+        'titles': [{'title': 'Higgs boson'}],
+        'authors': [{'full_name': 'Ellis, John'}],
+        'dois': [{'value': '10.1/abc'}],
+        'abstracts': [{'value': ' untouched '}],
+    }
+    assert record['titles'][0]['title'] == ' Higgs boson '
+    assert normalized['abstracts'] is record['abstracts']
+    assert sorted(fix['path'] for fix in fixes) == [
+        '/authors', '/authors/0/full_name', '/dois/0/value',
+        '/titles/0/title',
+    ]
+
+    normalized, fixes = normalizer.normalize(normalized)
+    assert fixes == []
+
+
+def test_normalizer_import_rule():
+    """Test rules given as import paths."""
+    normalizer = Normalizer(
+        {'title': ['invenio_record_editor.rules:strip_whitespace']})
+    assert normalizer.normalize({'title': ' a '})[0] == {'title': 'a'}
+    with pytest.raises(ImportError):
+        Normalizer({'title': ['invenio_record_editor.rules:missing']})
+
+
+def test_normalize_on_save(app):
+    """Test that records are normalized before being saved."""
+    InvenioRecordEditor(app)
+    authors = [{'full_name': 'Wang, Y.'}, {'full_name': 'Wang, Y.'}]
+    record = {
+        'titles': [{'title': ' Higgs '}],
+        'abstracts': [{'value': ' First.\n\nSecond. '}],
+        'authors': authors,
+    }
+    before_record_save.send(app, recid=1, record=record)
+    assert record == {
+        'titles': [{'title': 'Higgs'}],
+        'abstracts': [{'value': 'First.\n\nSecond.'}],
+        'authors': authors,
+    }
+
+    app.config['RECORD_EDITOR_NORMALIZE_ON_SAVE'] = False
+    record = {'titles': [{'title': ' Higgs '}]}
+    before_record_save.send(app, recid=1, record=record)
+    assert record == {'titles': [{'title': ' Higgs '}]}
+
+
+def test_suggest_fixes_view(app):
+    """Test the suggest fixes endpoint."""
+    InvenioRecordEditor(app)
+    with app.test_client() as client:
+        res = client.post(
+            '/editor/api/fixes',
+            data=json.dumps({'dois': [{'value': 'doi:10.1/abc'}]}),
+            content_type='application/json')
+        assert res.status_code == 200
+        data = json.loads(res.get_data(as_text=True))
+        assert data['fixes'] == [
+            {'op': 'replace', 'path': '/dois/0/value', 'value': '10.1/abc'}]
+        assert data['record'] == {'dois': [{'value': '10.1/abc'}]}
+
+        res = client.post(
+            '/editor/api/fixes',
+            data=json.dumps({'authors': [{'full_name': 'Wang, Y. '},
+                                         {'full_name': 'Wang, Y.'}]}),
+            content_type='application/json')
+        data = json.loads(res.get_data(as_text=True))
+        assert data['record'] == {'authors': [{'full_name': 'Wang, Y.'}]}
+
+        res = client.post('/editor/api/fixes', data='null',
+                          content_type='application/json')
+        assert res.status_code == 400
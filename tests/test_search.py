@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Sidebar search tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+
+from invenio_record_editor import InvenioRecordEditor
+from invenio_record_editor.search import RecordIndex, get_values
+from invenio_record_editor.signals import record_saved
+
+
+def test_get_values():
+    """Test extraction of values under a dotted path."""
+    record = {
+        'titles': [{'title': 'Higgs boson'}, {'title': 'Higgs'}],
+        'control_number': 1,
+    }
+    assert list(get_values(record, 'titles.title')) == [
+        'Higgs boson', 'Higgs']
+    assert list(get_values(record, 'control_number')) == [1]
+    assert list(get_values(record, 'missing.field')) == []
+
+
+def test_index_search():
+    """Test indexing and multi-term queries."""
+    index = RecordIndex(['titles.title', 'authors.full_name'])
+    index.index(1, {'titles': [{'title': 'Higgs boson discovery'}]})
+    index.index(2, {'titles': [{'title': 'Search for the Higgs'}],
+                    'authors': [{'full_name': 'Ellis, John'}]})
+    index.index(3, {'titles': [{'title': 'Boson stars'}]})
+
+    assert index.search('higgs') == (2, [1, 2])
+    assert index.search('Higgs BOSON') == (1, [1])
+    assert index.search('higgs ellis') == (1, [2])
+    assert index.search('higgs unknown') == (0, [])
+    assert index.search('') == (0, [])
+    assert index.search('higgs', page=2, size=1) == (2, [2])
+
+
+def test_index_update_delete():
+    """Test that reindexing and deleting update the postings."""
+    index = RecordIndex(['titles.title'])
+    index.index(1, {'titles': [{'title': 'Higgs boson'}]})
+    index.index(1, {'titles': [{'title': 'Top quark'}]})
+    assert len(index) == 1
+    assert index.search('higgs') == (0, [])
+    assert index.search('quark') == (1, [1])
+
+    index.delete(1)
+    index.delete(1)
+    assert len(index) == 0
+    assert index.search('quark') == (0, [])
+
+
+def test_bulk_index():
+    """Test indexing many records at once."""
+    index = RecordIndex(['titles.title'])
+    index.index(2, {'titles': [{'title': 'Higgs boson'}]})
+    assert index.bulk_index(
+        (recid, {'titles': [{'title': 'Higgs {0}'.format(recid)}]})
+        for recid in range(5)) == 5
+    assert len(index) == 5
+    assert index.search('higgs') == (5, [2, 0, 1, 3, 4])
+    assert index.search('boson') == (0, [])
+    assert index.search('3') == (1, [3])
+
+
+def test_records_loader(app):
+    """Test that the index is filled by the loader on first use."""
+    loaded = []
+
+    def loader():
+        loaded.append(True)
+        return [(1, {'titles': [{'title': 'Higgs boson'}]})]
+
+    app.config['RECORD_EDITOR_SEARCH_RECORDS_LOADER'] = loader
+    InvenioRecordEditor(app)
+    assert loaded == []
+    record_saved.send(app, recid=2,
+                      record={'titles': [{'title': 'Higgs search'}]})
+    with app.test_client() as client:
+        res = client.get('/editor/api/search?q=higgs')
+        assert json.loads(res.get_data(as_text=True))['hits'] == [1, 2]
+    assert loaded == [True]
+
+
+def test_search_view(app):
+    """Test the search endpoint."""
+    InvenioRecordEditor(app)
+    with app.app_context():
+        record_saved.send(app, recid=1,
+                          record={'titles': [{'title': 'Higgs boson'}]})
+        record_saved.send(app, recid=2,
+                          record={'titles': [{'title': 'Higgs'}]})
+
+    with app.test_client() as client:
+        res = client.get('/editor/api/search?q=higgs&size=1')
+        assert res.status_code == 200
+        data = json.loads(res.get_data(as_text=True))
+        assert data['total'] == 2
+        assert data['hits'] == [1]
+
+        res = client.get('/editor/api/search?q=higgs&size=1000')
+        assert res.status_code == 400